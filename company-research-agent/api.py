@@ -16,7 +16,7 @@ if env_path.exists():
     load_dotenv(dotenv_path=env_path, override=True)
 
 # 导入生成报告的逻辑
-from backend.graph import Graph
+from backend.graph import Graph, node_pool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -71,6 +71,9 @@ async def stream_research_report(request: Request, body: CompanyResearchRequest)
         except Exception as e:
             logger.exception("研究失败")
             yield f"event: error\ndata: {str(e)}\n\n".encode("utf-8")
+        finally:
+            # 取消任务仍在后台进行的工作（如网站抓取）
+            node_pool.release_job(task_id)
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
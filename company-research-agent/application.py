@@ -12,16 +12,33 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from backend.graph import Graph # 图形流程或任务图，执行实际的研究任务
+from backend.graph import Graph, node_pool # 图形流程或任务图，执行实际的研究任务；node_pool 为进程级共享的节点池
 from backend.services.websocket_manager import WebSocketManager # WebSocket管理器，管理连接并发送更新
 import logging
 import uvicorn
 from datetime import datetime
 import asyncio
+import time
 import uuid
 from collections import defaultdict
+from typing import List
 from backend.services.mongodb import MongoDBService # MongoDB服务，用于存储和检索研究结果
 from backend.services.pdf_service import PDFService # PDF服务，用于生成PDF报告
+from backend.services.clients import get_client_registry # 进程级共享的 Tavily / OpenRouter 客户端连接池
+from backend.services.tracing import tracer # 任务级链路追踪，记录各节点和外部调用耗时
+from backend.services.scheduler import JobScheduler # 有界、带优先级的研究任务调度器
+from backend.services.metrics import metrics # 进程内指标（队列深度、等待时间等）
+from backend.services.ratelimit import rate_limiters # 按服务商和接口的全局限流（令牌桶 + 并发上限）
+from backend.services.executor import cpu_executor # CPU 密集型步骤（引用链接、PDF 渲染）的进程池
+from backend.services.checkpoints import checkpoint_store # 节点级检查点（SQLite），用于中断后恢复任务
+from backend.services.snapshots import snapshot_store # 按公司保存的分类数据和报告快照，用于增量刷新
+from backend.services.batch import BatchContext, batch_registry # 批量研究：批次内共享相同的搜索和提取请求
+from backend.services.documents import document_store # 按任务、按内容寻址的文档库，状态中只保存文档 ID
+from backend.services.search_cache import search_cache # Tavily 搜索结果的持久化 TTL 缓存
+from backend.services.query_cache import query_cache # 按公司、行业、分析师和日期区间缓存生成的查询
+from backend.services.url_registry import url_registry # 任务级 URL 登记：跨分类去重提取
+from backend.services.query_dedup import query_dedup # 任务内近似重复查询合并为一次搜索
+from backend.services.search_strategy import search_strategy # 分级搜索深度，按分析师保留率调整结果数量
 
 # 配置日志记录器
 logger = logging.getLogger()
@@ -55,13 +72,16 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
 
 # 创建WebSocket管理器实例
 manager = WebSocketManager()
 
+# 创建任务调度器实例，限制同时运行的研究任务数量（RESEARCH_WORKERS）
+scheduler = JobScheduler(websocket_manager=manager)
+
 # 创建PDF服务实例
 pdf_service = PDFService({"pdf_output_dir": "pdfs"})
 
@@ -73,6 +93,7 @@ job_status = defaultdict(lambda: {
     "debug_info": [], # 调试信息
     "company": None, # 公司名称
     "report": None, # 报告内容
+    "timings": None, # 各节点及外部调用的耗时汇总
     "last_update": datetime.now().isoformat() # 最后更新时间    
 })
 
@@ -85,6 +106,31 @@ if mongodb_uri := os.getenv("MONGODB_URI"):
     except Exception as e:
         logger.error(f"Failed to initialize MongoDB service: {e}")
 
+# 启动时预热 CPU 进程池和节点池并编译工作流模板，并提前建立到 Tavily / OpenRouter 的长连接
+@app.on_event("startup")
+async def warm_up_workflow():
+    await cpu_executor.warm_up()
+    try:
+        node_pool.warm_up()
+        logger.info("Research workflow compiled and node pool warmed up")
+    except Exception as e:
+        logger.error(f"Failed to warm up research workflow: {e}")
+    await get_client_registry().warm_up()
+    scheduler.start()
+    await resume_incomplete_jobs()
+
+# 关闭时停止调度器并释放共享连接池和进程池
+@app.on_event("shutdown")
+async def close_clients():
+    await scheduler.stop()
+    await get_client_registry().aclose()
+    cpu_executor.shutdown()
+    checkpoint_store.close()
+    snapshot_store.close()
+    document_store.close()
+    search_cache.close()
+    query_cache.close()
+
 # 定义研究请求模型
 class ResearchRequest(BaseModel):
     company: str
@@ -92,6 +138,13 @@ class ResearchRequest(BaseModel):
     industry: str | None = None
     hq_location: str | None = None
     use_local_data: bool = False  # 默认使用本地数据模式
+    priority: int = 0  # 调度优先级，数值越大越先执行
+    refresh: bool = False  # 增量刷新：复用未过期的分类数据，只更新过期分类对应的报告章节
+    deadline_seconds: float | None = None  # 响应时间预算（从提交开始计时），超时前各阶段逐步降级
+
+# 定义批量研究请求模型
+class BatchResearchRequest(BaseModel):
+    requests: List[ResearchRequest]
 
 # 定义PDF生成请求模型，定义了但好像未调用
 class PDFGenerationRequest(BaseModel):
@@ -118,13 +171,25 @@ async def research(data: ResearchRequest):
     try:
         logger.info(f"Received research request for {data.company}")
         job_id = str(uuid.uuid4())
-        asyncio.create_task(process_research(job_id, data))
+        job_status[job_id].update({
+            "status": "queued",
+            "company": data.company,
+            "last_update": datetime.now().isoformat()
+        })
+        start_deadline(job_id, data)
+        await checkpoint_store.register_job(job_id, data.dict())
+        queue_position = await scheduler.submit(
+            job_id,
+            lambda: process_research(job_id, data),
+            priority=data.priority
+        )
 
         response = JSONResponse(content={
             "status": "accepted",
             "job_id": job_id,
-            "message": "Research started. Connect to WebSocket for updates.",
-            "websocket_url": f"/research/ws/{job_id}"
+            "message": "Research queued. Connect to WebSocket for updates.",
+            "websocket_url": f"/research/ws/{job_id}",
+            "queue_position": queue_position
         })
         response.headers["Access-Control-Allow-Origin"] = "*"
         response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
@@ -135,17 +200,123 @@ async def research(data: ResearchRequest):
         logger.error(f"Error initiating research: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# 定义批量研究请求处理函数：所有公司进入同一个调度队列，批次内相同的搜索和 URL 提取只执行一次
+@app.post("/research/batch")
+async def research_batch(data: BatchResearchRequest):
+    if not data.requests:
+        raise HTTPException(status_code=400, detail="Batch contains no research requests")
+    try:
+        batch_id = str(uuid.uuid4())
+        jobs = {str(uuid.uuid4()): request for request in data.requests}
+        batch = BatchContext(batch_id, {job_id: request.company for job_id, request in jobs.items()}, manager)
+        batch_registry.add(batch)
+        logger.info(f"Received batch {batch_id} with {len(jobs)} research requests")
+
+        queue_positions = {}
+        for job_id, request in jobs.items():
+            job_status[job_id].update({
+                "status": "queued",
+                "company": request.company,
+                "last_update": datetime.now().isoformat()
+            })
+            start_deadline(job_id, request)
+            await checkpoint_store.register_job(job_id, request.dict())
+            queue_positions[job_id] = await scheduler.submit(
+                job_id,
+                lambda job_id=job_id, request=request: process_batch_job(batch, job_id, request),
+                priority=request.priority
+            )
+
+        return {
+            "status": "accepted",
+            "batch_id": batch_id,
+            "message": "Batch queued. Connect to the batch WebSocket for overall progress.",
+            "websocket_url": f"/research/ws/{batch_id}",
+            "jobs": [
+                {
+                    "job_id": job_id,
+                    "company": request.company,
+                    "websocket_url": f"/research/ws/{job_id}",
+                    "queue_position": queue_positions[job_id]
+                }
+                for job_id, request in jobs.items()
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Error initiating batch research: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 批量研究任务：在批次上下文中运行，并汇报批次整体进度
+async def process_batch_job(batch: BatchContext, job_id: str, data: ResearchRequest):
+    await batch.update_job(job_id, "processing")
+    try:
+        await batch.run(process_research(job_id, data))
+    finally:
+        status = "cancelled" if scheduler.cancel_requested(job_id) else job_status[job_id]["status"]
+        await batch.update_job(job_id, status if status in ("completed", "cancelled") else "failed")
+
+# 取消研究任务：排队中的任务直接出队，运行中的任务取消整个任务树（包括进行中的 Tavily / LLM 请求）
+@app.delete("/research/{job_id}")
+async def cancel_research(job_id: str):
+    if job_id not in job_status:
+        raise HTTPException(status_code=404, detail="Research job not found")
+    previous_status = job_status[job_id]["status"]
+    if previous_status in ("completed", "failed", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Research job already {previous_status}")
+
+    # 先取消再记录状态：取消期间任务可能已经完成或失败，此时保留它的最终状态
+    cancelled_in = await scheduler.cancel(job_id)
+    status = job_status[job_id]["status"]
+    if status in ("completed", "failed"):
+        raise HTTPException(status_code=409, detail=f"Research job already {status}")
+    if cancelled_in is None:
+        raise HTTPException(status_code=409, detail="Research job is not queued or running")
+
+    job_status[job_id].update({
+        "status": "cancelled",
+        "last_update": datetime.now().isoformat()
+    })
+
+    logger.info(f"Cancelled research job {job_id} ({cancelled_in})")
+    await checkpoint_store.finish_job(job_id, "cancelled")
+    if mongodb:
+        mongodb.update_job(job_id=job_id, status="cancelled")
+    if cancelled_in == "queued" and (batch := batch_registry.for_job(job_id)):
+        await batch.update_job(job_id, "cancelled")
+    await manager.send_status_update(
+        job_id=job_id,
+        status="cancelled",
+        message="Research cancelled"
+    )
+    return {"status": "cancelled", "job_id": job_id, "cancelled_while": cancelled_in}
+
+# 查询批次进度
+@app.get("/research/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = batch_registry.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.summary()
+
+# 记录任务截止时间：时间预算从提交时开始计算，包含排队时间
+def start_deadline(job_id: str, data: ResearchRequest):
+    if data.deadline_seconds:
+        job_status[job_id]["deadline"] = time.time() + data.deadline_seconds
+
 # 定义研究处理函数
-async def process_research(job_id: str, data: ResearchRequest):
+async def process_research(job_id: str, data: ResearchRequest, resumed: bool = False):
+    tracer.start_job(job_id)
     try:
-        if mongodb:
+        if mongodb and not resumed:
             mongodb.create_job(job_id, data.dict())
         await asyncio.sleep(1)  # 等待1秒，允许WebSocket连接
 
         # 发送状态更新
+        job_status[job_id]["status"] = "processing"
+        await checkpoint_store.set_status(job_id, "processing")
         await manager.send_status_update(job_id, status="processing", message="Starting research")
 
-        # 创建图形流程或任务图实例
+        # 创建任务图句柄（复用进程级已编译的工作流和节点池）
         graph = Graph(
             company=data.company,
             url=data.company_url,
@@ -153,7 +324,10 @@ async def process_research(job_id: str, data: ResearchRequest):
             hq_location=data.hq_location,
             websocket_manager=manager,
             job_id=job_id,
-            use_local_data=data.use_local_data  # 传递本地数据模式选项
+            use_local_data=data.use_local_data,  # 传递本地数据模式选项
+            refresh=data.refresh,
+            deadline=job_status[job_id].get("deadline"),
+            deadline_seconds=data.deadline_seconds
         )
 
         state = {}
@@ -172,7 +346,11 @@ async def process_research(job_id: str, data: ResearchRequest):
             })
             if mongodb:
                 mongodb.update_job(job_id=job_id, status="completed")
-                mongodb.store_report(job_id=job_id, report_data={"report": report_content})
+                mongodb.store_report(job_id=job_id, report_data={
+                    "report": report_content,
+                    "references": state.get('references', [])
+                })
+            await checkpoint_store.finish_job(job_id, "completed")
             await manager.send_status_update(
                 job_id=job_id,
                 status="completed",
@@ -190,6 +368,8 @@ async def process_research(job_id: str, data: ResearchRequest):
             error_message = "No report found"
             if error := state.get('error'):
                 error_message = f"Error: {error}"
+            job_status[job_id]["status"] = "failed"
+            await checkpoint_store.finish_job(job_id, "failed")
             
             await manager.send_status_update(
                 job_id=job_id,
@@ -200,6 +380,7 @@ async def process_research(job_id: str, data: ResearchRequest):
 
     except Exception as e:
         logger.error(f"Research failed: {str(e)}")
+        job_status[job_id]["status"] = "failed"
         await manager.send_status_update(
             job_id=job_id,
             status="failed",
@@ -208,12 +389,73 @@ async def process_research(job_id: str, data: ResearchRequest):
         )
         if mongodb:
             mongodb.update_job(job_id=job_id, status="failed", error=str(e))
+        await checkpoint_store.finish_job(job_id, "failed")
+    finally:
+        record_timings(job_id)
+        # 进程关闭时被中断的任务保留文档，恢复时还要用
+        node_pool.release_job(job_id)
+        url_registry.release(job_id)
+        if search_stats := query_dedup.release(job_id):
+            job_status[job_id]["searches"] = search_stats
+        if scheduler.cancel_requested(job_id) or not asyncio.current_task().cancelling():
+            await document_store.release(job_id)
+
+# 启动时恢复上次进程退出时仍在排队或运行的任务，已完成的节点从检查点恢复
+async def resume_incomplete_jobs():
+    try:
+        jobs = await checkpoint_store.incomplete_jobs()
+    except Exception as e:
+        logger.error(f"Failed to load incomplete jobs from checkpoint store: {e}")
+        return
+    for job_id, request in jobs:
+        try:
+            data = ResearchRequest(**request)
+        except Exception as e:
+            logger.error(f"Skipping job {job_id}: invalid stored request: {e}")
+            await checkpoint_store.finish_job(job_id, "failed")
+            continue
+        logger.info(f"Resuming research job {job_id} for {data.company}")
+        job_status[job_id].update({
+            "status": "queued",
+            "company": data.company,
+            "last_update": datetime.now().isoformat()
+        })
+        start_deadline(job_id, data)
+        await scheduler.submit(
+            job_id,
+            lambda job_id=job_id, data=data: process_research(job_id, data, resumed=True),
+            priority=data.priority
+        )
+
+# 将任务的耗时汇总写入任务记录
+def record_timings(job_id: str):
+    try:
+        timings = tracer.finish_job(job_id)
+        if not timings:
+            return
+        job_status[job_id]["timings"] = timings
+        logger.info(f"Job {job_id} finished in {timings['total_ms']:.0f} ms, node timings: {timings['nodes']}")
+        if mongodb:
+            mongodb.update_job(job_id=job_id, result={"timings": timings})
+    except Exception as e:
+        logger.error(f"Failed to record timings for job {job_id}: {e}")
 
 # 定义获取请求处理函数
 @app.get("/")
 async def ping():
     return {"message": "Alive"}
 
+# 调度器及服务指标
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "scheduler": scheduler.stats(),
+        "rate_limits": rate_limiters.stats(),
+        "documents": document_store.stats(),
+        "search_strategy": search_strategy.stats(),
+        **metrics.snapshot()
+    }
+
 # 定义获取PDF请求处理函数
 @app.get("/research/pdf/{filename}")
 async def get_pdf(filename: str):
@@ -238,6 +480,20 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
                 error=status["error"],
                 result=status["result"]
             )
+            if (position := scheduler.position(job_id)) is not None:
+                await manager.send_status_update(
+                    job_id,
+                    status="queued",
+                    message=f"Waiting in queue (position {position})",
+                    result={"step": "Queued", "queue_position": position}
+                )
+        elif batch := batch_registry.get(job_id):
+            await manager.send_status_update(
+                job_id,
+                status="batch_completed" if batch.finished else "batch_progress",
+                message="Connected to batch status stream",
+                result=batch.summary()
+            )
 
         while True:
             try:
@@ -260,6 +516,17 @@ async def get_research(job_id: str):
         raise HTTPException(status_code=404, detail="Research job not found")
     return job
 
+# 导出任务的 Chrome trace-event 格式追踪文件（可在 Perfetto 中打开）
+@app.get("/research/{job_id}/trace")
+async def get_research_trace(job_id: str):
+    trace = tracer.get(job_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return JSONResponse(
+        content=trace.to_chrome_trace(),
+        headers={"Content-Disposition": f'attachment; filename="trace_{job_id}.json"'}
+    )
+
 # 定义获取请求处理函数
 @app.get("/research/{job_id}/report")
 async def get_research_report(job_id: str):
@@ -278,14 +545,14 @@ async def get_research_report(job_id: str):
 # 定义生成PDF请求处理函数
 @app.post("/research/{job_id}/generate-pdf")
 async def generate_pdf(job_id: str):
-    return pdf_service.generate_pdf_from_job(job_id, job_status, mongodb)
+    return await pdf_service.generate_pdf_from_job(job_id, job_status, mongodb)
 
 # 定义生成PDF请求处理函数
 @app.post("/generate-pdf")
 async def generate_pdf(data: GeneratePDFRequest):
     """Generate a PDF from markdown content and stream it to the client."""
     try:
-        success, result = pdf_service.generate_pdf_stream(data.report_content, data.company_name)
+        success, result = await pdf_service.generate_pdf_stream(data.report_content, data.company_name)
         if success:
             pdf_buffer, filename = result
             return StreamingResponse(
@@ -28,6 +28,6 @@ if not os.getenv("OPENAI_API_KEY"):
 #if not os.getenv("GEMINI_API_KEY"):
 #    logger.warning("GEMINI_API_KEY environment variable is not set.")
 
-from .graph import Graph
+from .graph import Graph, node_pool
 
-__all__ = ["Graph"]
+__all__ = ["Graph", "node_pool"]
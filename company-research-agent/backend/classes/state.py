@@ -1,4 +1,5 @@
-from typing import TypedDict, NotRequired, Required, Dict, List, Any
+from typing import TypedDict, NotRequired, Required, Dict, List, Any, Annotated
+import operator
 from backend.services.websocket_manager import WebSocketManager
 
 # 定义输入状态
@@ -9,10 +10,14 @@ class InputState(TypedDict, total=False):
     industry: NotRequired[str]
     websocket_manager: NotRequired[WebSocketManager]
     job_id: NotRequired[str]
+    refresh: NotRequired[bool]  # 增量刷新：复用未过期的分类数据
+    deadline: NotRequired[float]  # 截止时间（epoch 秒）
+    deadline_seconds: NotRequired[float]  # 总时间预算（秒）
 
 # 定义研究状态
 class ResearchState(InputState):
     site_scrape: Dict[str, Any]
+    site_scrape_pending: bool  # 网站抓取仍在后台进行，策展前合并
     messages: List[Any]
     financial_data: Dict[str, Any]
     news_data: Dict[str, Any]
@@ -27,5 +32,9 @@ class ResearchState(InputState):
     industry_briefing: str
     company_briefing: str
     references: List[str]
+    reference_titles: Dict[str, str]
+    reference_info: Dict[str, Any]
+    refreshed_categories: Annotated[List[str], operator.add]  # 本次重新研究的分类
+    deadline_degraded: bool  # 分类流水线私有：某阶段因截止时间缩减了工作，不保存快照
     briefings: Dict[str, Any]
     report: str
\ No newline at end of file
@@ -1,28 +1,154 @@
 from langchain_core.messages import SystemMessage
 from langgraph.graph import StateGraph
-from typing import Dict, Any, AsyncIterator
+from typing import Dict, Any, AsyncIterator, Optional
 import logging
+import threading
 
 from .classes.state import InputState
 from .nodes import GroundingNode
 from .nodes.researchers import (FinancialAnalyst, NewsScanner, 
-                               IndustryAnalyzer, CompanyAnalyzer)
-from .nodes.collector import Collector
+                               IndustryAnalyzer, CompanyAnalyzer, QueryPlanner)
 from .nodes.curator import Curator
 from .nodes.enricher import Enricher
 from .nodes.briefing import Briefing
 from .nodes.editor import Editor
+from .nodes.pipeline import CategoryPipeline
+from .services.checkpoints import checkpointed_node
+from .services.tracing import traced_node
 
 logger = logging.getLogger(__name__)
 
+class NodePool:
+    """Process-wide pool of warm workflow nodes and compiled graph templates.
+
+    Nodes hold no per-job state (company, job_id and the websocket manager
+    travel through the graph state), so a single set of instances per data
+    mode is shared by every job running in the process.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[bool, Dict[str, Any]] = {}
+        self._compiled: Dict[bool, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_nodes(self, use_local_data: bool = False) -> Dict[str, Any]:
+        """Return the shared node instances for the given data mode."""
+        if use_local_data not in self._nodes:
+            with self._lock:
+                if use_local_data not in self._nodes:
+                    self._nodes[use_local_data] = self._create_nodes(use_local_data)
+        return self._nodes[use_local_data]
+
+    def get_compiled_graph(self, use_local_data: bool = False):
+        """Return the compiled workflow template for the given data mode."""
+        if use_local_data not in self._compiled:
+            nodes = self.get_nodes(use_local_data)
+            with self._lock:
+                if use_local_data not in self._compiled:
+                    logger.info(f"Compiling research workflow (use_local_data={use_local_data})")
+                    self._compiled[use_local_data] = build_workflow(nodes).compile()
+        return self._compiled[use_local_data]
+
+    def warm_up(self, use_local_data: bool = False) -> None:
+        """Instantiate nodes and compile the workflow ahead of the first job."""
+        self.get_compiled_graph(use_local_data)
+
+    def release_job(self, job_id: str) -> None:
+        """Cancel and drop the background work the shared nodes hold for a job."""
+        for nodes in self._nodes.values():
+            nodes["grounding"].release(job_id)
+            nodes["query_planner"].release(job_id)
+
+    @staticmethod
+    def _create_nodes(use_local_data: bool) -> Dict[str, Any]:
+        """Initialize all workflow nodes"""
+        logger.info(f"Initializing workflow nodes (use_local_data={use_local_data})")
+        analysts = {
+            "financial_analyst": FinancialAnalyst(use_local_data=use_local_data),
+            "news_scanner": NewsScanner(use_local_data=use_local_data),
+            "industry_analyst": IndustryAnalyzer(use_local_data=use_local_data),
+            "company_analyst": CompanyAnalyzer(use_local_data=use_local_data),
+        }
+        # One LLM call plans the queries of all analysts of a job
+        planner = QueryPlanner(analysts["company_analyst"].openai_client, list(analysts.values()))
+        for analyst in analysts.values():
+            analyst.query_planner = planner
+        return {
+            "grounding": GroundingNode(),
+            "query_planner": planner,
+            **analysts,
+            "curator": Curator(),
+            "enricher": Enricher(),
+            "briefing": Briefing(),
+            "editor": Editor(),
+        }
+
+# Research node -> data field handled by its category pipeline
+RESEARCH_CATEGORIES = {
+    "financial_analyst": "financial_data",
+    "news_scanner": "news_data",
+    "industry_analyst": "industry_data",
+    "company_analyst": "company_data"
+}
+
+def build_workflow(nodes: Dict[str, Any]) -> StateGraph:
+    """Configure the state graph workflow.
+
+    Every category runs its own research -> curate -> enrich -> brief chain
+    as a single node, so categories never wait on each other until the
+    editor joins them. Grounding only starts the website extraction; each
+    pipeline merges the site content after its searches, before curation.
+    """
+    workflow = StateGraph(InputState)
+
+    pipelines = {}
+    for research_node, data_field in RESEARCH_CATEGORIES.items():
+        pipelines[f"{data_field.replace('_data', '')}_pipeline"] = CategoryPipeline(
+            nodes[research_node],
+            nodes["curator"],
+            nodes["enricher"],
+            nodes["briefing"],
+            data_field,
+            grounding=nodes["grounding"]
+        )
+
+    # Add nodes with their respective processing functions, traced and
+    # checkpointed per job so an interrupted job resumes after its last
+    # completed node
+    def add_node(name: str, func) -> None:
+        workflow.add_node(name, traced_node(name, checkpointed_node(name, func)))
+
+    add_node("grounding", nodes["grounding"].run)
+    for name, pipeline in pipelines.items():
+        add_node(name, pipeline.run)
+    add_node("editor", nodes["editor"].run)
+
+    # Configure workflow edges
+    workflow.set_entry_point("grounding")
+    workflow.set_finish_point("editor")
+
+    for name in pipelines:
+        workflow.add_edge("grounding", name)
+
+    # The editor starts once every category briefing is ready
+    workflow.add_edge(list(pipelines), "editor")
+    return workflow
+
+# Shared by every Graph instance in this process
+node_pool = NodePool()
+
 class Graph:
+    """Per-job handle on the shared, pre-compiled research workflow."""
+
     def __init__(self, company=None, url=None, hq_location=None, industry=None,
-                 websocket_manager=None, job_id=None, use_local_data: bool = False):
+                 websocket_manager=None, job_id=None, use_local_data: bool = False,
+                 refresh: bool = False, deadline: Optional[float] = None,
+                 deadline_seconds: Optional[float] = None):
         self.websocket_manager = websocket_manager
         self.job_id = job_id
         self.use_local_data = use_local_data  # 使用传入的 use_local_data 参数
         
-        # Initialize InputState
+        # Per-job data only travels through the input state
         self.input_state = InputState(
             company=company,
             company_url=url,
@@ -30,69 +156,18 @@ class Graph:
             industry=industry,
             websocket_manager=websocket_manager,
             job_id=job_id,
+            refresh=refresh,
             messages=[
                 SystemMessage(content="Expert researcher starting investigation")
             ]
         )
-
-        # Initialize nodes with WebSocket manager and job ID
-        self._init_nodes()
-        self._build_workflow()
-
-    def _init_nodes(self):
-        """Initialize all workflow nodes"""
-        self.ground = GroundingNode()
-        self.financial_analyst = FinancialAnalyst(use_local_data=self.use_local_data)
-        self.news_scanner = NewsScanner(use_local_data=self.use_local_data)
-        self.industry_analyst = IndustryAnalyzer(use_local_data=self.use_local_data)
-        self.company_analyst = CompanyAnalyzer(use_local_data=self.use_local_data)
-        self.collector = Collector()
-        self.curator = Curator()
-        self.enricher = Enricher()
-        self.briefing = Briefing()
-        self.editor = Editor()
-
-    def _build_workflow(self):
-        """Configure the state graph workflow"""
-        self.workflow = StateGraph(InputState)
-        
-        # Add nodes with their respective processing functions
-        self.workflow.add_node("grounding", self.ground.run)
-        self.workflow.add_node("financial_analyst", self.financial_analyst.run)
-        self.workflow.add_node("news_scanner", self.news_scanner.run)
-        self.workflow.add_node("industry_analyst", self.industry_analyst.run)
-        self.workflow.add_node("company_analyst", self.company_analyst.run)
-        self.workflow.add_node("collector", self.collector.run)
-        self.workflow.add_node("curator", self.curator.run)
-        self.workflow.add_node("enricher", self.enricher.run)
-        self.workflow.add_node("briefing", self.briefing.run)
-        self.workflow.add_node("editor", self.editor.run)
-
-        # Configure workflow edges
-        self.workflow.set_entry_point("grounding")
-        self.workflow.set_finish_point("editor")
-        
-        research_nodes = [
-            "financial_analyst", 
-            "news_scanner",
-            "industry_analyst", 
-            "company_analyst"
-        ]
-
-        # Connect grounding to all research nodes
-        for node in research_nodes:
-            self.workflow.add_edge("grounding", node)
-            self.workflow.add_edge(node, "collector")
-
-        # Connect remaining nodes
-        self.workflow.add_edge("collector", "curator")
-        self.workflow.add_edge("curator", "enricher")
-        self.workflow.add_edge("enricher", "briefing")
-        self.workflow.add_edge("briefing", "editor")
+        if deadline is not None:
+            self.input_state['deadline'] = deadline
+            self.input_state['deadline_seconds'] = deadline_seconds
 
     async def run(self, thread: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
         """Execute the research workflow"""
-        compiled_graph = self.workflow.compile()
+        compiled_graph = node_pool.get_compiled_graph(self.use_local_data)
         
         async for state in compiled_graph.astream(
             self.input_state,
@@ -118,5 +193,4 @@ class Graph:
         )
     
     def compile(self):
-        graph = self.workflow.compile()
-        return graph
\ No newline at end of file
+        return node_pool.get_compiled_graph(self.use_local_data)
@@ -1,11 +1,13 @@
 import google.generativeai as genai
 from typing import Dict, Any, Union, List
-import os
 import logging
+import os
 
-from openai import AsyncOpenAI
 from ..classes import ResearchState
-import asyncio
+from ..services.clients import get_client_registry
+from ..services.tracing import traced
+from ..services.url_registry import url_registry
+from ..utils.deadline import scaled
 
 logger = logging.getLogger(__name__)
 
@@ -14,22 +16,31 @@ class Briefing:
     
     def __init__(self) -> None:
         self.max_doc_length = 8000  # Maximum document content length
+        self.max_context_length = 120000  # Maximum total document text per briefing
+        # Documents curated by several categories are briefed in full only by their owner
+        self.dedup_shared_docs = os.getenv("BRIEFING_DEDUP_SHARED_DOCS", "true").lower() not in ("0", "false", "no")
         #self.gemini_key = os.getenv("GEMINI_API_KEY")
         #if not self.gemini_key:
         #    raise ValueError("GEMINI_API_KEY environment variable is not set")
         
-        # Configure Gemini
-        self.openai_key = os.getenv("OPENAI_API_KEY")
-        if not self.openai_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        
-        # Configure OpenAI
-        self.openai_client = AsyncOpenAI(api_key=self.openai_key,base_url="https://openrouter.ai/api/v1")
+        # Configure OpenAI (shared connection pool)
+        self.openai_client = get_client_registry().openai
 
+        # Mapping of curated data fields to briefing categories
+        self.categories = {
+            'financial_data': ("financial", "financial_briefing"),
+            'news_data': ("news", "news_briefing"),
+            'industry_data': ("industry", "industry_briefing"),
+            'company_data': ("company", "company_briefing")
+        }
+
+    @traced("generate_category_briefing")
     async def generate_category_briefing(
         self, docs: Union[Dict[str, Any], List[Dict[str, Any]]], 
         category: str, context: Dict[str, Any]
     ) -> Dict[str, Any]:
+        max_doc_length = context.get('max_doc_length', self.max_doc_length)
+        max_context_length = context.get('max_context_length', self.max_context_length)
         company = context.get('company', 'Unknown')
         industry = context.get('industry', 'Unknown')
         hq_location = context.get('hq_location', 'Unknown')
@@ -165,10 +176,10 @@ Key requirements:
         for _ , doc in sorted_items:
             title = doc.get('title', '')
             content = doc.get('raw_content') or doc.get('content', '')
-            if len(content) > self.max_doc_length:
-                content = content[:self.max_doc_length] + "... [content truncated]"
+            if len(content) > max_doc_length:
+                content = content[:max_doc_length] + "... [content truncated]"
             doc_entry = f"Title: {title}\n\nContent: {content}"
-            if total_length + len(doc_entry) < 120000:  # Keep under limit
+            if total_length + len(doc_entry) < max_context_length:  # Keep under limit
                 doc_texts.append(doc_entry)
                 total_length += len(doc_entry)
             else:
@@ -214,101 +225,55 @@ Analyze the following documents and extract key information. Provide only the br
             logger.error(f"Error generating {category} briefing: {e}")
             return {'content': ''}
 
-    async def create_briefings(self, state: ResearchState) -> ResearchState:
-        """Create briefings for all categories in parallel."""
-        company = state.get('company', 'Unknown Company')
-        websocket_manager = state.get('websocket_manager')
-        job_id = state.get('job_id')
-        
-        # Send initial briefing status
-        if websocket_manager and job_id:
-            await websocket_manager.send_status_update(
-                job_id=job_id,
-                status="processing",
-                message="Starting research briefings",
-                result={"step": "Briefing"}
-            )
-
-        context = {
-            "company": company,
+    def _briefing_context(self, state: ResearchState) -> Dict[str, Any]:
+        return {
+            "company": state.get('company', 'Unknown Company'),
             "industry": state.get('industry', 'Unknown'),
             "hq_location": state.get('hq_location', 'Unknown'),
-            "websocket_manager": websocket_manager,
-            "job_id": job_id
+            "websocket_manager": state.get('websocket_manager'),
+            "job_id": state.get('job_id'),
+            # Smaller context windows (faster briefings) when behind the deadline
+            "max_doc_length": scaled(state, "brief", self.max_doc_length, minimum=1000),
+            "max_context_length": scaled(state, "brief", self.max_context_length, minimum=10000)
         }
-        logger.info(f"Creating section briefings for {company}")
-        
-        # Mapping of curated data fields to briefing categories
-        categories = {
-            'financial_data': ("financial", "financial_briefing"),
-            'news_data': ("news", "news_briefing"),
-            'industry_data': ("industry", "industry_briefing"),
-            'company_data': ("company", "company_briefing")
-        }
-        
-        briefings = {}
-
-        # Create tasks for parallel processing
-        briefing_tasks = []
-        for data_field, (cat, briefing_key) in categories.items():
-            curated_key = f'curated_{data_field}'
-            curated_data = state.get(curated_key, {})
-            
-            if curated_data:
-                logger.info(f"Processing {data_field} with {len(curated_data)} documents")
-                
-                # Create task for this category
-                briefing_tasks.append({
-                    'category': cat,
-                    'briefing_key': briefing_key,
-                    'data_field': data_field,
-                    'curated_data': curated_data
-                })
-            else:
-                logger.info(f"No data available for {data_field}")
-                state[briefing_key] = ""
-
-        # Process briefings in parallel with rate limiting
-        if briefing_tasks:
-            # Rate limiting semaphore for LLM API
-            briefing_semaphore = asyncio.Semaphore(2)  # Limit to 2 concurrent briefings
-            
-            async def process_briefing(task: Dict[str, Any]) -> Dict[str, Any]:
-                """Process a single briefing with rate limiting."""
-                async with briefing_semaphore:
-                    result = await self.generate_category_briefing(
-                        task['curated_data'],
-                        task['category'],
-                        context
-                    )
-                    
-                    if result['content']:
-                        briefings[task['category']] = result['content']
-                        state[task['briefing_key']] = result['content']
-                        logger.info(f"Completed {task['data_field']} briefing ({len(result['content'])} characters)")
-                    else:
-                        logger.error(f"Failed to generate briefing for {task['data_field']}")
-                        state[task['briefing_key']] = ""
-                    
-                    return {
-                        'category': task['category'],
-                        'success': bool(result['content']),
-                        'length': len(result['content']) if result['content'] else 0
-                    }
 
-            # Process all briefings in parallel
-            results = await asyncio.gather(*[
-                process_briefing(task) 
-                for task in briefing_tasks
-            ])
-            
-            # Log completion statistics
-            successful_briefings = sum(1 for r in results if r['success'])
-            total_length = sum(r['length'] for r in results)
-            logger.info(f"Generated {successful_briefings}/{len(briefing_tasks)} briefings with total length {total_length}")
-
-        state['briefings'] = briefings
-        return state
-
-    async def run(self, state: ResearchState) -> ResearchState:
-        return await self.create_briefings(state)
\ No newline at end of file
+    def _without_shared_content(self, state: ResearchState, category: str,
+                                docs: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce documents owned by another category to their search snippet."""
+        job_urls = url_registry.for_job(state.get('job_id'))
+        if not job_urls:
+            return docs
+        reduced = {}
+        shared = 0
+        for url, doc in docs.items():
+            owner = job_urls.owner(url)
+            if owner and owner != category and doc.get('raw_content') and doc.get('content'):
+                doc = {key: value for key, value in doc.items() if key != 'raw_content'}
+                shared += 1
+            reduced[url] = doc
+        if shared:
+            logger.info(f"{category} briefing: {shared} documents briefed in full by other categories, "
+                        f"using their snippets")
+        return reduced
+
+    async def create_category_briefing(self, state: ResearchState, data_field: str) -> str:
+        """Create the briefing for a single category; returns '' when there is nothing to brief."""
+        category, _ = self.categories[data_field]
+        curated_data = state.get(f'curated_{data_field}', {})
+        if not curated_data:
+            logger.info(f"No data available for {data_field}")
+            return ""
+
+        logger.info(f"Processing {data_field} with {len(curated_data)} documents")
+        if self.dedup_shared_docs:
+            curated_data = self._without_shared_content(state, category, curated_data)
+        result = await self.generate_category_briefing(
+            curated_data,
+            category,
+            self._briefing_context(state)
+        )
+        if result['content']:
+            logger.info(f"Completed {data_field} briefing ({len(result['content'])} characters)")
+        else:
+            logger.error(f"Failed to generate briefing for {data_field}")
+        return result['content']
@@ -1,16 +1,22 @@
-from langchain_core.messages import AIMessage
-from typing import Dict
+from typing import Dict, Any
 from ..classes import ResearchState
 from urllib.parse import urlparse, urljoin
 import logging
-from ..utils.references import process_references_from_search_results
+from ..services.search_strategy import RELEVANCE_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
 class Curator:
     def __init__(self) -> None:
-        self.relevance_threshold = 0.4  # Fixed initialization of class attribute
-        logger.info("Curator initialized with relevance threshold: {relevance_threshhold}")
+        # Shared with search_strategy, which escalates searches with too few relevant results
+        self.relevance_threshold = RELEVANCE_THRESHOLD
+        self.data_types = {
+            'financial_data': ('💰 Financial', 'financial'),
+            'news_data': ('📰 News', 'news'),
+            'industry_data': ('🏭 Industry', 'industry'),
+            'company_data': ('🏢 Company', 'company')
+        }
+        logger.info(f"Curator initialized with relevance threshold: {self.relevance_threshold}")
 
     async def evaluate_documents(self, state: ResearchState, docs: list, context: Dict[str, str]) -> list:
         """Evaluate documents based on Tavily's scoring."""
@@ -82,152 +88,79 @@ class Curator:
         
         return evaluated_docs
 
-    async def curate_data(self, state: ResearchState) -> ResearchState:
-        """Curate all collected data based on Tavily scores."""
-        company = state.get('company', 'Unknown Company')
-        logger.info(f"Starting curation for company: {company}")
-        
-        # Send initial status update through WebSocket
+    async def curate_category(self, state: ResearchState, data_field: str) -> Dict[str, Any]:
+        """Curate a single category of collected data based on Tavily scores.
+
+        Returns the kept documents keyed by URL (at most 30, best first).
+        """
+        emoji, doc_type = self.data_types[data_field]
+        data = state.get(data_field, {})
+        if not data:
+            await self._send_curation_complete(state, doc_type, 0, 0)
+            return {}
+
+        context = {
+            "company": state.get('company', 'Unknown Company'),
+            "industry": state.get('industry', 'Unknown'),
+            "hq_location": state.get('hq_location', 'Unknown')
+        }
+
+        # Filter and normalize URLs
+        unique_docs = {}
+        for url, doc in data.items():
+            try:
+                parsed = urlparse(url)
+                if not parsed.scheme:
+                    url = urljoin('https://', url)
+                clean_url = parsed._replace(query='', fragment='').geturl()
+                if clean_url not in unique_docs:
+                    doc['url'] = clean_url
+                    doc['doc_type'] = doc_type
+                    unique_docs[clean_url] = doc
+            except Exception as e:
+                continue
+
+        docs = list(unique_docs.values())
+
         if websocket_manager := state.get('websocket_manager'):
             if job_id := state.get('job_id'):
-                logger.info(f"Sending initial curation status update for job {job_id}")
                 await websocket_manager.send_status_update(
                     job_id=job_id,
-                    status="processing",
-                    message=f"Starting document curation for {company}",
+                    status="category_start",
+                    message=f"Processing {doc_type} documents",
                     result={
                         "step": "Curation",
-                        "doc_counts": {
-                            "company": {"initial": 0, "kept": 0},
-                            "industry": {"initial": 0, "kept": 0},
-                            "financial": {"initial": 0, "kept": 0},
-                            "news": {"initial": 0, "kept": 0}
-                        }
+                        "doc_type": doc_type,
+                        "initial_count": len(docs)
                     }
                 )
 
-        industry = state.get('industry', 'Unknown')
-        context = {
-            "company": company,
-            "industry": industry,
-            "hq_location": state.get('hq_location', 'Unknown')
-        }
+        evaluated_docs = await self.evaluate_documents(state, docs, context)
 
-        msg = [f"🔍 Curating research data for {company}"]
-        
-        data_types = {
-            'financial_data': ('💰 Financial', 'financial'),
-            'news_data': ('📰 News', 'news'),
-            'industry_data': ('🏭 Industry', 'industry'),
-            'company_data': ('🏢 Company', 'company')
-        }
+        # Limit to top 30 documents per category (evaluated docs are sorted by score)
+        relevant_docs = {doc['url']: doc for doc in evaluated_docs[:30]}
 
-        # Create all evaluation tasks upfront
-        curation_tasks = []
-        for data_field, (emoji, doc_type) in data_types.items():
-            data = state.get(data_field, {})
-            if not data:
-                continue
+        if relevant_docs:
+            logger.info(f"Kept {len(relevant_docs)} documents for {doc_type} with scores above threshold")
+        else:
+            logger.info(f"No documents met relevance threshold for {doc_type}")
 
-            # Filter and normalize URLs
-            unique_docs = {}
-            for url, doc in data.items():
-                try:
-                    parsed = urlparse(url)
-                    if not parsed.scheme:
-                        url = urljoin('https://', url)
-                    clean_url = parsed._replace(query='', fragment='').geturl()
-                    if clean_url not in unique_docs:
-                        doc['url'] = clean_url
-                        doc['doc_type'] = doc_type
-                        unique_docs[clean_url] = doc
-                except Exception as e:
-                    continue
-
-            docs = list(unique_docs.values())
-            curation_tasks.append((data_field, emoji, doc_type, unique_docs.keys(), docs))
-
-        # Track document counts for each type
-        doc_counts = {}
-
-        for data_field, emoji, doc_type, urls, docs in curation_tasks:
-            msg.append(f"\n{emoji}: Found {len(docs)} documents")
-
-            if websocket_manager := state.get('websocket_manager'):
-                if job_id := state.get('job_id'):
-                    await websocket_manager.send_status_update(
-                        job_id=job_id,
-                        status="category_start",
-                        message=f"Processing {doc_type} documents",
-                        result={
-                            "step": "Curation",
-                            "doc_type": doc_type,
-                            "initial_count": len(docs)
-                        }
-                    )
+        await self._send_curation_complete(state, doc_type, len(docs), len(relevant_docs))
+        return relevant_docs
 
-            evaluated_docs = await self.evaluate_documents(state, docs, context)
-
-            if not evaluated_docs:
-                msg.append(f"  ⚠️ No relevant documents found")
-                doc_counts[data_field] = {"initial": len(docs), "kept": 0}
-                continue
-
-            # Filter and sort by Tavily score
-            relevant_docs = {url: doc for url, doc in zip(urls, evaluated_docs)}
-            sorted_items = sorted(relevant_docs.items(), key=lambda item: item[1]['evaluation']['overall_score'], reverse=True)
-            
-            # Limit to top 30 documents per category
-            if len(sorted_items) > 30:
-                sorted_items = sorted_items[:30]
-            relevant_docs = dict(sorted_items)
-
-            doc_counts[data_field] = {
-                "initial": len(docs),
-                "kept": len(relevant_docs)
-            }
-
-            if relevant_docs:
-                msg.append(f"  ✓ Kept {len(relevant_docs)} relevant documents")
-                logger.info(f"Kept {len(relevant_docs)} documents for {doc_type} with scores above threshold")
-            else:
-                msg.append(f"  ⚠️ No documents met relevance threshold")
-                logger.info(f"No documents met relevance threshold for {doc_type}")
-
-            # Store curated documents in state
-            state[f'curated_{data_field}'] = relevant_docs
-            
-        # Process references using the references module
-        top_reference_urls, reference_titles, reference_info = process_references_from_search_results(state)
-        logger.info(f"Selected top {len(top_reference_urls)} references for the report")
-        
-        # Update state with references and their titles
-        messages = state.get('messages', [])
-        messages.append(AIMessage(content="\n".join(msg)))
-        state['messages'] = messages
-        state['references'] = top_reference_urls
-        state['reference_titles'] = reference_titles
-        state['reference_info'] = reference_info
-
-        # Send final curation stats
+    async def _send_curation_complete(self, state: ResearchState, doc_type: str, initial: int, kept: int) -> None:
+        """Report a category's final counts; the UI merges them into the counts of the other categories."""
         if websocket_manager := state.get('websocket_manager'):
             if job_id := state.get('job_id'):
                 await websocket_manager.send_status_update(
                     job_id=job_id,
                     status="curation_complete",
-                    message="Document curation complete",
+                    message=f"{doc_type.capitalize()} document curation complete",
                     result={
                         "step": "Curation",
+                        "category": doc_type,
                         "doc_counts": {
-                            "company": doc_counts.get('company_data', {"initial": 0, "kept": 0}),
-                            "industry": doc_counts.get('industry_data', {"initial": 0, "kept": 0}),
-                            "financial": doc_counts.get('financial_data', {"initial": 0, "kept": 0}),
-                            "news": doc_counts.get('news_data', {"initial": 0, "kept": 0})
+                            doc_type: {"initial": initial, "kept": kept}
                         }
                     }
                 )
-
-        return state
-
-    async def run(self, state: ResearchState) -> ResearchState:
-        return await self.curate_data(state)
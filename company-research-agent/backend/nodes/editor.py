@@ -1,7 +1,6 @@
 from langchain_core.messages import AIMessage
 from typing import Dict, Any, List
-from openai import AsyncOpenAI
-import os
+import asyncio
 import logging
 import re
 import json
@@ -9,31 +8,34 @@ import json
 logger = logging.getLogger(__name__)
 
 from ..classes import ResearchState
+from ..services.clients import get_client_registry
+from ..services.documents import document_store
+from ..services.executor import compact_curated_data, cpu_executor, link_paragraphs, link_text, select_references
+from ..services.snapshots import snapshot_store
+from ..services.tracing import traced
+from ..utils.deadline import budget_factor
 from ..utils.references import format_references_section
 from ..utils.text_reference_linker import TextReferenceLinker
 from ..utils.local_data import LocalDataManager
 
 class Editor:
     """Compiles individual section briefings into a cohesive final report."""
+
+    # Report section (## heading) written from each category's briefing
+    SECTION_HEADINGS = {
+        'company': 'Company Overview',
+        'industry': 'Industry Overview',
+        'financial': 'Financial Overview',
+        'news': 'News'
+    }
+    REFERENCE_HEADINGS = ('References', '参考文献')
     
     def __init__(self) -> None:
-        self.openai_key = os.getenv("OPENAI_API_KEY")
-        if not self.openai_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        
-        # Configure OpenAI
-        self.openai_client = AsyncOpenAI(api_key=self.openai_key, base_url="https://openrouter.ai/api/v1")
-        
-        # Initialize context dictionary for use across methods
-        self.context = {
-            "company": "Unknown Company",
-            "industry": "Unknown",
-            "hq_location": "Unknown"
-        }
+        # Configure OpenAI (shared connection pool)
+        self.openai_client = get_client_registry().openai
         
-        # 初始化数据管理器和文本引用链接器
+        # 初始化数据管理器；文本引用链接器按任务创建，节点实例在任务间共享
         self.local_data_manager = LocalDataManager()
-        self.text_linker = TextReferenceLinker(data_dir=self.local_data_manager.data_dir)
 
     def _build_compilation_prompt(self, briefings: Dict[str, str], company: str) -> str:
         """构建用于编译报告的提示词。"""
@@ -116,14 +118,6 @@ Please compile the report now, ensuring all information is accurate and well-org
         logger.info(f"Starting report compilation for company: {company}")
         logger.info(f"Current state keys: {list(state.keys())}")
         
-        # Update context with values from state
-        self.context = {
-            "company": company,
-            "industry": state.get('industry', 'Unknown'),
-            "hq_location": state.get('hq_location', 'Unknown')
-        }
-        logger.info(f"Updated context: {self.context}")
-        
         # Send initial compilation status
         if websocket_manager := state.get('websocket_manager'):
             if job_id := state.get('job_id'):
@@ -207,63 +201,20 @@ Please compile the report now, ensuring all information is accurate and well-org
     async def edit_report(self, state: ResearchState, briefings: Dict[str, str], context: Dict[str, Any]) -> str:
         """Compile section briefings into a final report and update the state."""
         try:
-            company = self.context["company"]
-            
-            # Step 1: Initial Compilation
-            if websocket_manager := state.get('websocket_manager'):
-                if job_id := state.get('job_id'):
-                    await websocket_manager.send_status_update(
-                        job_id=job_id,
-                        status="processing",
-                        message="Compiling initial research report",
-                        result={
-                            "step": "Editor",
-                            "substep": "compilation"
-                        }
-                    )
-
-            edited_report = await self.compile_content(state, briefings, company)
-            if not edited_report:
-                logger.error("Initial compilation failed")
-                return ""
-
-            # Step 2: Deduplication and Cleanup
-            if websocket_manager := state.get('websocket_manager'):
-                if job_id := state.get('job_id'):
-                    await websocket_manager.send_status_update(
-                        job_id=job_id,
-                        status="processing",
-                        message="Cleaning up and organizing report",
-                        result={
-                            "step": "Editor",
-                            "substep": "cleanup"
-                        }
-                    )
+            company = context["company"]
+            text_linker = TextReferenceLinker(data_dir=self.local_data_manager.data_dir)
 
-            # Step 3: Formatting Final Report
-            if websocket_manager := state.get('websocket_manager'):
-                if job_id := state.get('job_id'):
-                    await websocket_manager.send_status_update(
-                        job_id=job_id,
-                        status="processing",
-                        message="Formatting final report",
-                        result={
-                            "step": "Editor",
-                            "substep": "format"
-                        }
-                    )
-            final_report = await self.content_sweep(state, edited_report, company)
-            
-            # 如果 content_sweep 返回空字符串，使用初始编译的报告
+            # 增量刷新：已有上次报告时只重写重新研究过的章节
+            previous = await self._load_previous_report(state)
+            if previous:
+                final_report = await self.update_sections(state, briefings, context, previous, text_linker)
+            else:
+                final_report = await self.compile_report(state, briefings, context, text_linker)
             if not final_report or not final_report.strip():
-                logger.warning("Content sweep returned empty report, using initial compilation")
-                final_report = edited_report
-            
-            logger.info(f"Final report compiled with {len(final_report)} characters")
-            if not final_report.strip():
-                logger.error("Both initial compilation and content sweep failed to generate report")
+                logger.error("Report compilation failed")
                 return ""
             
+            logger.info(f"Final report compiled with {len(final_report)} characters")
             logger.info("Final report preview:")
             logger.info(final_report[:500])
             
@@ -295,21 +246,225 @@ Please compile the report now, ensuring all information is accurate and well-org
             logger.error(f"Error in edit_report: {e}")
             return ""
     
-    async def compile_content(self, state: ResearchState, briefings: Dict[str, str], company: str) -> str:
+    async def compile_report(self, state: ResearchState, briefings: Dict[str, str], context: Dict[str, Any],
+                             text_linker: TextReferenceLinker) -> str:
+        """Compile the full report from every briefing."""
+        company = context["company"]
+
+        # Step 1: Initial Compilation
+        if websocket_manager := state.get('websocket_manager'):
+            if job_id := state.get('job_id'):
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="processing",
+                    message="Compiling initial research report",
+                    result={
+                        "step": "Editor",
+                        "substep": "compilation"
+                    }
+                )
+
+        edited_report = await self.compile_content(state, briefings, company, text_linker)
+        if not edited_report:
+            logger.error("Initial compilation failed")
+            return ""
+
+        # Step 2: Deduplication and Cleanup
+        if websocket_manager := state.get('websocket_manager'):
+            if job_id := state.get('job_id'):
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="processing",
+                    message="Cleaning up and organizing report",
+                    result={
+                        "step": "Editor",
+                        "substep": "cleanup"
+                    }
+                )
+
+        # Step 3: Formatting Final Report
+        if websocket_manager := state.get('websocket_manager'):
+            if job_id := state.get('job_id'):
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="processing",
+                    message="Formatting final report",
+                    result={
+                        "step": "Editor",
+                        "substep": "format"
+                    }
+                )
+        if budget_factor(state, "edit") < 1.0:
+            # 时间预算不足：跳过格式整理，直接使用初始编译的报告
+            logger.warning("Behind the job deadline, skipping content sweep")
+            final_report = edited_report
+        else:
+            final_report = await self.content_sweep(state, edited_report, context, text_linker)
+        
+        # 如果 content_sweep 返回空字符串，使用初始编译的报告
+        if not final_report or not final_report.strip():
+            logger.warning("Content sweep returned empty report, using initial compilation")
+            final_report = edited_report
+        
+        if final_report.strip():
+            await self._save_report_snapshot(company, final_report, text_linker)
+        return final_report
+
+    async def _load_previous_report(self, state: ResearchState) -> Dict[str, Any]:
+        """Previous report for a refresh run, or {} when the full report must be compiled."""
+        if not state.get('refresh'):
+            return {}
+        try:
+            previous = await snapshot_store.load(state.get('company'), "report")
+        except Exception as e:
+            logger.warning(f"Failed to load previous report: {e}")
+            return {}
+        if not previous or not previous.get('report') or not previous.get('linker_state'):
+            return {}
+        return previous
+
+    async def _save_report_snapshot(self, company: str, report: str, text_linker: TextReferenceLinker) -> None:
+        try:
+            await snapshot_store.save(company, "report", {
+                "report": report,
+                "linker_state": text_linker.export_state()
+            })
+        except Exception as e:
+            logger.warning(f"Failed to save report snapshot: {e}")
+
+    @staticmethod
+    def _split_sections(report: str) -> List[List[str]]:
+        """Split a report into [heading, body] pairs on its ## headings (the preamble has heading "")."""
+        sections = [["", []]]
+        for line in report.split('\n'):
+            if line.startswith('## '):
+                sections.append([line[3:].strip(), []])
+            else:
+                sections[-1][1].append(line)
+        return [[heading, '\n'.join(lines).strip()] for heading, lines in sections]
+
+    @traced("update_sections")
+    async def update_sections(self, state: ResearchState, briefings: Dict[str, str], context: Dict[str, Any],
+                              previous: Dict[str, Any], text_linker: TextReferenceLinker) -> str:
+        """Rewrite only the sections of the previous report whose categories were re-researched."""
+        company = context["company"]
+        refreshed = [c for c in state.get('refreshed_categories') or [] if c in briefings]
+        # 沿用上次报告的引用编号，未变化章节中的脚注保持有效
+        text_linker.load_state(previous['linker_state'])
+        if not refreshed:
+            logger.info(f"All categories reused for {company}, keeping previous report")
+            return previous['report']
+
+        if websocket_manager := state.get('websocket_manager'):
+            if job_id := state.get('job_id'):
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="processing",
+                    message=f"Updating report sections: {', '.join(refreshed)}",
+                    result={
+                        "step": "Editor",
+                        "substep": "refresh",
+                        "categories": refreshed
+                    }
+                )
+
+        for category in refreshed:
+            docs = await document_store.get_documents(state.get('job_id'), state.get(f'{category}_data', {}))
+            for url, doc in docs.items():
+                if content := doc.get('content'):
+                    text_linker.add_data_source(content, url, doc.get('title', ''), doc.get('score', 0.0))
+
+        sections = self._split_sections(previous['report'])
+        new_bodies = await asyncio.gather(*[
+            self.rewrite_section(category, briefings[category], sections, context)
+            for category in refreshed
+        ])
+
+        for category, body in zip(refreshed, new_bodies):
+            if not body:
+                logger.warning(f"Keeping previous {category} section, rewrite failed")
+                continue
+            linked, linker_state = await cpu_executor.run(link_text, text_linker.export_state(), body)
+            text_linker.load_state(linker_state)
+            # process_text appends the reference list; it is rebuilt once below
+            references = text_linker.get_references_section()
+            if references and linked.endswith(references):
+                linked = linked[:-len(references)]
+            heading = self.SECTION_HEADINGS[category]
+            for section in sections:
+                if section[0] == heading:
+                    section[1] = linked.strip()
+                    break
+            else:
+                sections.append([heading, linked.strip()])
+
+        parts = []
+        for heading, body in sections:
+            if heading in self.REFERENCE_HEADINGS:
+                continue
+            block = f"## {heading}\n\n{body}" if heading else body
+            if block.strip():
+                parts.append(block.strip())
+        final_report = '\n\n'.join(parts) + text_linker.get_references_section()
+
+        await self._save_report_snapshot(company, final_report, text_linker)
+        return final_report
+
+    @traced("rewrite_section")
+    async def rewrite_section(self, category: str, briefing: str, sections: List[List[str]],
+                              context: Dict[str, Any]) -> str:
+        """Rewrite one report section from its updated briefing."""
+        company = context["company"]
+        heading = self.SECTION_HEADINGS[category]
+        previous_body = next((body for h, body in sections if h == heading), "")
+        layout = ("Use only bullet points (*), never headers." if category == 'news'
+                  else "Use ### for subsections.")
+        prompt = f"""You are updating the "## {heading}" section of an existing research report on {company}, the {context["industry"]} company headquartered in {context["hq_location"]}.
+
+Previous version of the section:
+{previous_body or "(none)"}
+
+Updated research briefing:
+{briefing}
+
+Rewrite the section so it reflects the updated briefing. Drop information that the briefing supersedes.
+1. {layout}
+2. Format all bullet points with *
+3. Never use code blocks (```)
+4. Do not include citations or reference marks; they are added afterwards
+5. Return only the section body in markdown, without the "## {heading}" line. No explanation."""
+        try:
+            response = await self.openai_client.chat.completions.create(
+                model="openai/gpt-4.1",
+                messages=[
+                    {"role": "system", "content": "You are an expert markdown formatter that ensures consistent document structure."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0
+            )
+            body = response.choices[0].message.content.strip()
+            # The model sometimes repeats the heading anyway
+            return re.sub(rf'^##\s+{re.escape(heading)}\s*\n', '', body).strip()
+        except Exception as e:
+            logger.error(f"Error rewriting {category} section: {e}")
+            return ""
+
+    @traced("compile_content")
+    async def compile_content(self, state: ResearchState, briefings: Dict[str, str], company: str,
+                              text_linker: TextReferenceLinker) -> str:
         """编译研究内容，添加引用链接"""
         try:
             # 重置文本链接器状态
-            self.text_linker.reset()
+            text_linker.reset()
             
             # 收集所有数据源
             logger.info(f"Data source counts: { {k: len(v) for k, v in briefings.items()} }")
             
             # 从状态中获取数据源信息
+            # 文档正文保存在文档库中，状态里只有文档 ID
             data_sources = {
-                'company_data': state.get('company_data', {}),
-                'financial_data': state.get('financial_data', {}),
-                'news_data': state.get('news_data', {}),
-                'industry_data': state.get('industry_data', {})
+                data_type: await document_store.get_documents(state.get('job_id'), state.get(data_type, {}))
+                for data_type in ['company_data', 'financial_data', 'news_data', 'industry_data']
             }
             
             # 添加所有数据源到文本链接器
@@ -318,7 +473,7 @@ Please compile the report now, ensuring all information is accurate and well-org
                     if content := doc.get('content'):
                         title = doc.get('title', '')
                         score = doc.get('score', 0.0)
-                        self.text_linker.add_data_source(content, url, title, score)
+                        text_linker.add_data_source(content, url, title, score)
                         logger.info(f"Added source from {category}: url='{url}', title='{title}', score={score}")
             
             # 添加简报内容作为额外数据源
@@ -326,7 +481,7 @@ Please compile the report now, ensuring all information is accurate and well-org
                 if isinstance(content, str) and content.strip():
                     # 为简报内容生成一个唯一的URL
                     url = f"briefing://{category}"
-                    self.text_linker.add_data_source(content, url, f"{category} Briefing", 0.5)
+                    text_linker.add_data_source(content, url, f"{category} Briefing", 0.5)
                     logger.debug(f"Added briefing source: {category}")
             
             # 构建提示词
@@ -369,36 +524,18 @@ Please generate a clean, well-organized research report with proper citations us
             logger.info(f"Received initial report from LLM, length: {len(initial_report)}")
             logger.debug(f"Initial report preview: {initial_report[:200]}")
             
-            # 处理每个段落，添加引用链接
+            # 处理每个段落，添加引用链接（正则匹配在进程池中执行，不阻塞事件循环）
             paragraphs = initial_report.split('\n\n')
-            processed_paragraphs = []
-            
             logger.info(f"Processing {len(paragraphs)} paragraphs for reference linking")
-            
-            for i, paragraph in enumerate(paragraphs):
-                # 跳过标题行
-                if paragraph.startswith('#') or paragraph.startswith('##') or paragraph.startswith('###'):
-                    processed_paragraphs.append(paragraph)
-                    continue
-                
-                # 移除任何 HTML sup 标签和重复的引用
-                paragraph = re.sub(r'<sup>\[.*?\]</sup>', '', paragraph)  # 移除 HTML sup 标签
-                paragraph = re.sub(r'\[\^(\d+)\].*?\[\^\1\]', r'[^\1]', paragraph)  # 移除重复的引用
-                paragraph = re.sub(r'\[\^(\d+)\].*?<sup>\[\1.*?\]</sup>', r'[^\1]', paragraph)  # 移除引用和 sup 标签的组合
-                
-                # 使用 TextReferenceLinker 处理段落内容
-                processed_para = self.text_linker.process_text(paragraph)
-                if processed_para != paragraph:
-                    logger.info(f"Added references to paragraph {i+1}")
-                    logger.debug(f"Original: {paragraph[:100]}...")
-                    logger.debug(f"Processed: {processed_para[:100]}...")
-                processed_paragraphs.append(processed_para)
+            processed_paragraphs, references, linker_state = await cpu_executor.run(
+                link_paragraphs, text_linker.export_state(), paragraphs
+            )
+            text_linker.load_state(linker_state)
             
             # 重新组合处理后的段落
             final_report = '\n\n'.join(processed_paragraphs)
             
             # 添加引用部分
-            references = self.text_linker.get_references_section()
             if references:
                 # 移除引用部分中的 HTML 标签
                 references = re.sub(r'<.*?>', '', references)
@@ -411,17 +548,19 @@ Please generate a clean, well-organized research report with proper citations us
             logger.error(f"Error in compilation: {e}")
             return ""
         
-    async def content_sweep(self, state: ResearchState, content: str, company: str) -> str:
+    @traced("content_sweep")
+    async def content_sweep(self, state: ResearchState, content: str, context: Dict[str, Any],
+                            text_linker: TextReferenceLinker) -> str:
         """Sweep the content for any redundant information."""
         try:
+            company = context["company"]
             logger.info(f"Starting content sweep for {company}")
             logger.info(f"Input content length: {len(content)}")
             logger.debug(f"Input content preview: {content[:200]}")
             
-            # Use values from centralized context
-            company = self.context["company"]
-            industry = self.context["industry"]
-            hq_location = self.context["hq_location"]
+            # Use values from the per-job context
+            industry = context["industry"]
+            hq_location = context["hq_location"]
             
             prompt = f"""You are an expert briefing editor. You are given a report on {company}.
 
@@ -492,7 +631,10 @@ Return the polished report in flawless markdown format. No explanation."""
             logger.debug(f"Final text preview: {final_text[:200]}")
             
             # 再次使用 TextReferenceLinker 处理文本，确保所有数据点都有来源链接
-            processed_text = self.text_linker.process_text(final_text)
+            processed_text, linker_state = await cpu_executor.run(
+                link_text, text_linker.export_state(), final_text
+            )
+            text_linker.load_state(linker_state)
             if processed_text != final_text:
                 logger.info("Added additional references during content sweep")
                 logger.debug(f"Original: {final_text[:100]}...")
@@ -503,8 +645,42 @@ Return the polished report in flawless markdown format. No explanation."""
             logger.error(f"Error in content sweep: {e}")
             return content  # 如果出错，返回原始内容
 
+    @traced("select_references")
+    async def select_references(self, state: ResearchState) -> None:
+        """Pick the report's references from the curated documents of every category.
+
+        Runs at the join, once all category pipelines have finished; the
+        CPU pool only receives the fields reference selection reads.
+        """
+        try:
+            top_reference_urls, reference_titles, reference_info = await cpu_executor.run(
+                select_references, compact_curated_data(state)
+            )
+        except Exception as e:
+            logger.error(f"Error selecting references: {e}")
+            return
+        logger.info(f"Selected top {len(top_reference_urls)} references for the report")
+        state['references'] = top_reference_urls
+        state['reference_titles'] = reference_titles
+        state['reference_info'] = reference_info
+
+    @staticmethod
+    def mark_shared_documents(state: ResearchState) -> None:
+        """Record on each curated document every category that curated its URL.
+
+        Done at the join, once all pipelines have finished claiming URLs.
+        """
+        curated = {category: state.get(f'curated_{category}_data') or {} for category in ('company', 'industry', 'financial', 'news')}
+        for docs in curated.values():
+            for url, doc in docs.items():
+                doc['categories'] = [category for category, other in curated.items() if url in other]
+
     async def run(self, state: ResearchState) -> ResearchState:
+        self.mark_shared_documents(state)
+        await self.select_references(state)
         state = await self.compile_briefings(state)
+        # Appending channel: returning it would add the categories a second time
+        state.pop('refreshed_categories', None)
         # Ensure the Editor node's output is stored both top-level and under "editor"
         if 'report' in state:
             if 'editor' not in state or not isinstance(state['editor'], dict):
@@ -1,25 +1,48 @@
-from langchain_core.messages import AIMessage
-from typing import Dict, List
-import os
+from typing import Dict, List, Any, Optional
 import asyncio
 import logging
+import os
 from ..classes import ResearchState
-from tavily import AsyncTavilyClient
+from ..services.batch import shared_call
+from ..services.clients import get_client_registry
+from ..services.tracing import traced
+from ..services.url_registry import url_registry
+from ..utils.deadline import remaining, scaled
 
 logger = logging.getLogger(__name__)
 
+# Raw content from search shorter than this many characters is treated as truncated
+MIN_RAW_CONTENT_CHARS = int(os.getenv("ENRICH_MIN_RAW_CONTENT_CHARS", 500))
+
+
+def needs_extraction(doc: Dict[str, Any]) -> bool:
+    """Whether a document's raw content is missing or looks truncated.
+
+    Search results already carry raw content for most pages; only those
+    without it, or with less text than the search snippet or the minimum
+    length, are extracted again.
+    """
+    raw_content = (doc.get('raw_content') or '').strip()
+    return len(raw_content) < max(MIN_RAW_CONTENT_CHARS, len(doc.get('content') or ''))
+
+
 class Enricher:
     """Enriches curated documents with raw content."""
     
     def __init__(self) -> None:
-        # Tavily API 配置
-        tavily_key = os.getenv("TAVILY_API_KEY")
-        if not tavily_key:
-            raise ValueError("TAVILY_API_KEY environment variable is not set")
-        self.tavily_client = AsyncTavilyClient(api_key=tavily_key)
+        # Tavily API 配置（共享连接池）
+        self.tavily_client = get_client_registry().tavily
         
+        # 只用于进度汇报分组；并发由 tavily.extract 的自适应限流控制
         self.batch_size = 20
+        self.data_types = {
+            'financial_data': ('💰 Financial', 'financial'),
+            'news_data': ('📰 News', 'news'),
+            'industry_data': ('🏭 Industry', 'industry'),
+            'company_data': ('🏢 Company', 'company')
+        }
 
+    @traced("fetch_single_content")
     async def fetch_single_content(self, url: str, websocket_manager=None, job_id=None, category=None) -> Dict[str, str]:
         """Fetch raw content for a single URL."""
         try:
@@ -35,8 +58,16 @@ class Enricher:
                     }
                 )
 
-            # 使用 Tavily API 提取内容
-            result = await self.tavily_client.extract(url, extract_depth="advanced")
+            # 使用 Tavily API 提取内容（同一任务的各分类、同一批次内相同 URL 只提取一次）
+            def extract():
+                return shared_call(
+                    "extract",
+                    (url, "advanced"),
+                    lambda: self.tavily_client.extract(url, extract_depth="advanced")
+                )
+
+            job_urls = url_registry.for_job(job_id)
+            result = await (job_urls.fetch(url, extract) if job_urls else extract())
             
             if result and result.get('results'):
                 if websocket_manager and job_id:
@@ -83,42 +114,59 @@ class Enricher:
                 )
             return {url: ""}
 
-    async def fetch_raw_content(self, urls: List[str], websocket_manager=None, job_id=None, category=None) -> Dict[str, str]:
-        """Fetch raw content for multiple URLs in parallel."""
+    async def fetch_raw_content(self, urls: List[str], websocket_manager=None, job_id=None, category=None,
+                                state: Optional[ResearchState] = None) -> Dict[str, str]:
+        """Fetch raw content for multiple URLs in parallel.
+
+        With a job `state` that has a deadline, extractions still running when
+        it passes are cancelled; the content already extracted is returned.
+        """
         raw_contents = {}
         total_batches = (len(urls) + self.batch_size - 1) // self.batch_size
 
         # Create batches
         batches = [urls[i:i + self.batch_size] for i in range(0, len(urls), self.batch_size)]
         
-        # Process batches in parallel with rate limiting
-        semaphore = asyncio.Semaphore(3)  # Limit concurrent batches to 3
-        
+        # Extract concurrency is adapted process-wide by the tavily.extract limiter
         async def process_batch(batch_num: int, batch_urls: List[str]) -> Dict[str, str]:
-            async with semaphore:
-                if websocket_manager and job_id:
-                    await websocket_manager.send_status_update(
-                        job_id=job_id,
-                        status="batch_start",
-                        message=f"Processing batch {batch_num + 1}/{total_batches}",
-                        result={
-                            "step": "Enriching",
-                            "batch": batch_num + 1,
-                            "total_batches": total_batches,
-                            "category": category
-                        }
-                    )
+            if websocket_manager and job_id:
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="batch_start",
+                    message=f"Processing batch {batch_num + 1}/{total_batches}",
+                    result={
+                        "step": "Enriching",
+                        "batch": batch_num + 1,
+                        "total_batches": total_batches,
+                        "category": category
+                    }
+                )
 
-                # Process URLs in batch concurrently
-                tasks = [self.fetch_single_content(url, websocket_manager, job_id, category) for url in batch_urls]
-                results = await asyncio.gather(*tasks)
-                
-                # Combine results from batch
-                batch_contents = {}
-                for result in results:
-                    batch_contents.update(result)
-                
-                return batch_contents
+            # Process URLs in batch concurrently
+            tasks = [
+                asyncio.create_task(self.fetch_single_content(url, websocket_manager, job_id, category))
+                for url in batch_urls
+            ]
+            left = remaining(state) if state else None
+            try:
+                done, pending = await asyncio.wait(tasks, timeout=None if left is None else max(left, 0))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            if pending:
+                state['deadline_degraded'] = True
+                logger.warning(f"Deadline reached during {category} enrichment, keeping {len(done)} of "
+                               f"{len(tasks)} extractions in batch {batch_num + 1}")
+                for task in pending:
+                    task.cancel()
+
+            # Combine results from batch
+            batch_contents = {}
+            for task in done:
+                batch_contents.update(task.result())
+            
+            return batch_contents
 
         # Process all batches
         batch_results = await asyncio.gather(*[
@@ -132,167 +180,94 @@ class Enricher:
 
         return raw_contents
 
-    async def enrich_data(self, state: ResearchState) -> ResearchState:
-        """Enrich curated documents with raw content."""
-        company = state.get('company', 'Unknown Company')
+    async def enrich_category(self, state: ResearchState, data_field: str) -> Dict[str, Any]:
+        """Enrich one category of curated documents with raw content.
+
+        Returns enrichment stats; the curated documents are updated in place.
+        """
+        label, category = self.data_types[data_field]
+        curated_docs = state.get(f'curated_{data_field}', {})
         websocket_manager = state.get('websocket_manager')
         job_id = state.get('job_id')
 
+        # Find documents needing enrichment
+        docs_needing_content = {url: doc for url, doc in curated_docs.items() 
+                              if needs_extraction(doc)}
+        if not docs_needing_content:
+            return {'category': category, 'enriched': 0, 'total': 0, 'errors': 0}
+
+        # Behind the deadline: only enrich the highest scored documents
+        limit = scaled(state, "enrich", len(docs_needing_content), minimum=0)
+        if limit < len(docs_needing_content):
+            ranked = sorted(
+                docs_needing_content.items(),
+                key=lambda item: float(item[1].get('evaluation', {}).get('overall_score', item[1].get('score', 0))),
+                reverse=True
+            )
+            docs_needing_content = dict(ranked[:limit])
+            if not docs_needing_content:
+                logger.warning(f"No time left to enrich {category} documents")
+                return {'category': category, 'enriched': 0, 'total': 0, 'errors': 0}
+
         if websocket_manager and job_id:
             await websocket_manager.send_status_update(
                 job_id=job_id,
-                status="processing",
-                message=f"Starting content enrichment for {company}",
+                status="category_start",
+                message=f"Processing {label} documents",
                 result={
                     "step": "Enriching",
-                    "substep": "initialization"
+                    "category": category,
+                    "count": len(docs_needing_content)
                 }
             )
 
-        msg = [f"📚 Enriching curated data for {company}:"]
-
-        # Process each type of curated data
-        data_types = {
-            'financial_data': ('💰 Financial', 'financial'),
-            'news_data': ('📰 News', 'news'),
-            'industry_data': ('🏭 Industry', 'industry'),
-            'company_data': ('🏢 Company', 'company')
-        }
-
-        # Create tasks for parallel processing
-        enrichment_tasks = []
-        for data_field, (label, category) in data_types.items():
-            curated_field = f'curated_{data_field}'
-            curated_docs = state.get(curated_field, {})
-            
-            if not curated_docs:
-                msg.append(f"\n• No curated {label} documents to enrich")
-                continue
-
-            # Find documents needing enrichment
-            docs_needing_content = {url: doc for url, doc in curated_docs.items() 
-                                  if not doc.get('raw_content')}
+        try:
+            raw_contents = await self.fetch_raw_content(
+                list(docs_needing_content.keys()),
+                websocket_manager,
+                job_id,
+                category,
+                state=state
+            )
             
-            if not docs_needing_content:
-                msg.append(f"\n• All {label} documents already have raw content")
-                continue
+            enriched_count = 0
+            error_count = 0
             
-            msg.append(f"\n• Enriching {len(docs_needing_content)} {label} documents...")
+            for url, content_or_error in raw_contents.items():
+                if isinstance(content_or_error, dict) and content_or_error.get('error'):
+                    # This is an error result - just skip it
+                    error_count += 1
+                elif content_or_error:
+                    # This is a successful content; keep the search's raw content if it was longer
+                    if len(content_or_error) > len(curated_docs[url].get('raw_content') or ''):
+                        curated_docs[url]['raw_content'] = content_or_error
+                    enriched_count += 1
 
             if websocket_manager and job_id:
                 await websocket_manager.send_status_update(
                     job_id=job_id,
-                    status="category_start",
-                    message=f"Processing {label} documents",
+                    status="category_complete",
+                    message=f"Completed {label} documents",
                     result={
                         "step": "Enriching",
                         "category": category,
-                        "count": len(docs_needing_content)
+                        "enriched": enriched_count,
+                        "total": len(docs_needing_content)
                     }
                 )
-
-            # Create task for this category
-            enrichment_tasks.append({
-                'field': curated_field,
-                'category': category,
-                'label': label,
-                'docs': docs_needing_content,
-                'curated_docs': curated_docs
-            })
-
-        # Process all categories in parallel
-        if enrichment_tasks:
-            async def process_category(task):
-                try:
-                    raw_contents = await self.fetch_raw_content(
-                        list(task['docs'].keys()),
-                        websocket_manager,
-                        job_id,
-                        task['category']
-                    )
-                    
-                    enriched_count = 0
-                    error_count = 0
-                    
-                    for url, content_or_error in raw_contents.items():
-                        if isinstance(content_or_error, dict) and content_or_error.get('error'):
-                            # This is an error result - just skip it
-                            error_count += 1
-                        elif content_or_error:
-                            # This is a successful content
-                            task['curated_docs'][url]['raw_content'] = content_or_error
-                            enriched_count += 1
-
-                    # Update state with enriched documents
-                    state[task['field']] = task['curated_docs']
-                    
-                    if websocket_manager and job_id:
-                        await websocket_manager.send_status_update(
-                            job_id=job_id,
-                            status="category_complete",
-                            message=f"Completed {task['label']} documents",
-                            result={
-                                "step": "Enriching",
-                                "category": task['category'],
-                                "enriched": enriched_count,
-                                "total": len(task['docs'])
-                            }
-                        )
-                    
-                    return {
-                        'category': task['category'],
-                        'enriched': enriched_count,
-                        'total': len(task['docs']),
-                        'errors': error_count
-                    }
-                except Exception as e:
-                    # Log the error but don't fail the entire process
-                    print(f"Error processing category {task['category']}: {e}")
-                    return {
-                        'category': task['category'],
-                        'enriched': 0,
-                        'total': len(task['docs']),
-                        'errors': len(task['docs'])
-                    }
-
-            # Process all categories in parallel
-            results = await asyncio.gather(*[process_category(task) for task in enrichment_tasks])
             
-            # Calculate totals
-            total_enriched = sum(r['enriched'] for r in results)
-            total_documents = sum(r['total'] for r in results)
-            total_errors = sum(r.get('errors', 0) for r in results)
-
-            # Send final status update
-            if websocket_manager and job_id:
-                status_message = f"Content enrichment complete. Successfully enriched {total_enriched}/{total_documents} documents"
-                if total_errors > 0:
-                    status_message += f". Skipped {total_errors} documents."
-                
-                await websocket_manager.send_status_update(
-                    job_id=job_id,
-                    status="enrichment_complete",
-                    message=status_message,
-                    result={
-                        "step": "Enriching",
-                        "total_enriched": total_enriched,
-                        "total_documents": total_documents,
-                        "total_errors": total_errors
-                    }
-                )
-
-        # Update state with enrichment message
-        messages = state.get('messages', [])
-        messages.append(AIMessage(content="\n".join(msg)))
-        state['messages'] = messages
-        
-        return state
-
-    async def run(self, state: ResearchState) -> ResearchState:
-        try:
-            return await self.enrich_data(state)
+            return {
+                'category': category,
+                'enriched': enriched_count,
+                'total': len(docs_needing_content),
+                'errors': error_count
+            }
         except Exception as e:
-            # Log the error but don't fail the research process
-            print(f"Error in enrichment process: {e}")
-            # Return the original state without any enrichment
-            return state 
\ No newline at end of file
+            # Log the error but don't fail the entire process
+            logger.error(f"Error processing category {category}: {e}")
+            return {
+                'category': category,
+                'enriched': 0,
+                'total': len(docs_needing_content),
+                'errors': len(docs_needing_content)
+            }
@@ -1,9 +1,10 @@
 from langchain_core.messages import AIMessage
-import os
+from typing import Any, Dict, Optional, Tuple
+import asyncio
 import logging
 from ..classes import InputState, ResearchState
-from tavily import AsyncTavilyClient
-from openai import AsyncOpenAI
+from ..services.clients import get_client_registry
+from ..utils.deadline import within_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -11,17 +12,12 @@ class GroundingNode:
     """Gathers initial grounding data about the company."""
     
     def __init__(self) -> None:
-        # Tavily API 配置
-        tavily_key = os.getenv("TAVILY_API_KEY")
-        if not tavily_key:
-            raise ValueError("TAVILY_API_KEY environment variable is not set")
-        self.tavily_client = AsyncTavilyClient(api_key=tavily_key)
-        
-        # OpenAI API 配置
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if not openai_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.openai_client = AsyncOpenAI(api_key=openai_key, base_url="https://openrouter.ai/api/v1")
+        # Tavily / OpenAI 客户端由进程级注册表提供，共享连接池
+        clients = get_client_registry()
+        self.tavily_client = clients.tavily
+        self.openai_client = clients.openai
+        # job_id -> background website extraction, kept until the job is released
+        self._site_tasks: Dict[str, asyncio.Task] = {}
 
     async def initial_search(self, state: InputState) -> ResearchState:
         # Add debug logging at the start to check websocket manager
@@ -37,6 +33,7 @@ class GroundingNode:
         company = state.get('company', 'Unknown Company')
         msg = f"🎯 Initiating research for {company}...\n\n"
         site_scrape = {}
+        site_scrape_pending = False
         error_str = None
 
         # Only attempt extraction if we have a URL
@@ -54,26 +51,14 @@ class GroundingNode:
                         result={"step": "Initial Site Scrape"}
                     )
 
-            try:
-                # 使用 Tavily API 进行网站分析
-                logger.info("Initiating Tavily extraction")
-                site_extraction = await self.tavily_client.extract(url, extract_depth="advanced")
-                
-                raw_contents = []
-                for item in site_extraction.get("results", []):
-                    if content := item.get("raw_content"):
-                        raw_contents.append(content)
-                
-                if raw_contents:
-                    site_scrape = "\n".join(raw_contents)
-                    msg += "\n✓ Successfully extracted website content"
-                else:
-                    msg += "\n⚠️ No content found in website extraction"
-                    
-            except Exception as e:
-                error_str = str(e)
-                msg += f"\n⚠️ Error extracting website content: {error_str}"
-                logger.error(f"Error during website extraction: {e}")
+            if state.get('job_id'):
+                # 网站抓取在后台进行，分析师先行生成查询和搜索，策展前再合并
+                self._site_task(state)
+                site_scrape_pending = True
+                msg += "\n⏳ Website extraction running in the background"
+            else:
+                site_scrape, error_str = await self._extract_site(url)
+                msg += self._site_message(site_scrape, error_str)
 
         # Initialize ResearchState with input information
         research_state = {
@@ -85,16 +70,76 @@ class GroundingNode:
             # Initialize research fields
             "messages": [AIMessage(content=msg)],
             "site_scrape": site_scrape,
+            "site_scrape_pending": site_scrape_pending,
             # Pass through websocket info
             "websocket_manager": state.get('websocket_manager'),
             "job_id": state.get('job_id')
         }
 
         # If there was an error in the initial extraction, store it in the state
-        if "⚠️ Error extracting website content:" in msg:
+        if error_str:
             research_state["error"] = error_str
 
         return research_state
 
+    async def _extract_site(self, url: str) -> Tuple[Any, Optional[str]]:
+        """Extract the company website; returns (site content, error)."""
+        try:
+            # 使用 Tavily API 进行网站分析
+            logger.info("Initiating Tavily extraction")
+            site_extraction = await self.tavily_client.extract(url, extract_depth="advanced")
+
+            raw_contents = []
+            for item in site_extraction.get("results", []):
+                if content := item.get("raw_content"):
+                    raw_contents.append(content)
+            return ("\n".join(raw_contents) if raw_contents else {}), None
+        except Exception as e:
+            logger.error(f"Error during website extraction: {e}")
+            return {}, str(e)
+
+    @staticmethod
+    def _site_message(site_scrape: Any, error_str: Optional[str]) -> str:
+        if error_str:
+            return f"\n⚠️ Error extracting website content: {error_str}"
+        if site_scrape:
+            return "\n✓ Successfully extracted website content"
+        return "\n⚠️ No content found in website extraction"
+
+    def _site_task(self, state: ResearchState) -> asyncio.Task:
+        """Start (or join) the background website extraction of a job."""
+        job_id = state.get('job_id')
+        if (task := self._site_tasks.get(job_id)) is None:
+            task = asyncio.create_task(self._extract_site(state.get('company_url')))
+            self._site_tasks[job_id] = task
+        return task
+
+    def release(self, job_id: str) -> None:
+        """Cancel a finished, failed or cancelled job's website extraction and forget it."""
+        if (task := self._site_tasks.pop(job_id, None)) is not None and not task.done():
+            logger.info(f"Cancelling website extraction of job {job_id}")
+            task.cancel()
+
+    async def wait_for_site_scrape(self, state: ResearchState) -> Any:
+        """Website content for a job whose extraction was started by initial_search.
+
+        Returns the content already in the state when the extraction ran
+        inline, and re-starts the extraction when the job was resumed in a
+        process that never ran it.
+        """
+        if not state.get('site_scrape_pending') or not state.get('company_url'):
+            return state.get('site_scrape') or {}
+
+        task = self._site_task(state)
+        if not task.done():
+            logger.info(f"Waiting for website extraction of {state.get('company_url')}")
+        # shield: one pipeline hitting its deadline must not cancel the others' extraction
+        site_scrape, error_str = await within_deadline(
+            state, asyncio.shield(task), ({}, "deadline reached"), "website extraction"
+        )
+        if error_str:
+            logger.warning(f"Website extraction for {state.get('company')} failed: {error_str}")
+        return site_scrape
+
     async def run(self, state: InputState) -> ResearchState:
         return await self.initial_search(state)
@@ -0,0 +1,142 @@
+from typing import Dict, Any
+import logging
+
+from ..classes import ResearchState
+from ..services.documents import document_store
+from ..services.snapshots import snapshot_store
+from ..services.tracing import span
+from ..services.url_registry import url_registry
+from ..utils.deadline import expired
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryPipeline:
+    """Runs research → curate → enrich → brief for a single research category.
+
+    Each category runs as one graph node, so a fast category reaches its
+    briefing without waiting for the slower analysts; only the editor joins
+    all categories.
+    """
+
+    def __init__(self, analyst, curator, enricher, briefing, data_field: str, grounding=None) -> None:
+        self.analyst = analyst
+        self.grounding = grounding
+        self.curator = curator
+        self.enricher = enricher
+        self.briefing = briefing
+        self.data_field = data_field
+        self.category = data_field.replace('_data', '')
+        self.briefing_key = f"{self.category}_briefing"
+
+    async def run(self, state: ResearchState) -> Dict[str, Any]:
+        # Work on a private copy: parallel pipelines must only return the keys they own
+        state = dict(state)
+        state['messages'] = list(state.get('messages', []))
+
+        curated_field = f'curated_{self.data_field}'
+        if state.get('refresh'):
+            if reused := await self._reuse_snapshot(state):
+                return reused
+
+        # Job-wide URL registry: each URL is extracted once and briefed in full by one category
+        job_urls = url_registry.for_job(state.get('job_id'))
+
+        # Stages that reduce or cut short their work because of the deadline set this flag;
+        # such output is not saved for later refreshes
+        state['deadline_degraded'] = False
+        with span(f"{self.category}.research"):
+            result = await self.analyst.run(state)
+        state[self.data_field] = result.get(self.data_field) or state.get(self.data_field, {})
+
+        if self.grounding and state.get('site_scrape_pending'):
+            with span(f"{self.category}.site_scrape"):
+                await self._merge_site_scrape(state)
+
+        with span(f"{self.category}.curate"):
+            state[curated_field] = await self.curator.curate_category(state, self.data_field)
+        if job_urls:
+            for url in state[curated_field]:
+                job_urls.claim(url, self.category)
+
+        if expired(state):
+            state['deadline_degraded'] = True
+            logger.warning(f"Deadline passed, skipping {self.category} enrichment")
+        else:
+            with span(f"{self.category}.enrich"):
+                await self.enricher.enrich_category(state, self.data_field)
+
+        with span(f"{self.category}.brief"):
+            briefing = await self.briefing.create_category_briefing(state, self.data_field)
+
+        logger.info(f"{self.category} pipeline finished: {len(state[self.data_field])} documents, "
+                    f"{len(state[curated_field])} curated, briefing {len(briefing)} characters")
+        output = {
+            self.data_field: state[self.data_field],
+            curated_field: state[curated_field],
+            self.briefing_key: briefing
+        }
+        if state['deadline_degraded']:
+            logger.info(f"Not saving {self.category} snapshot: the deadline degraded this run")
+        elif briefing:
+            try:
+                await snapshot_store.save(state.get('company'), self.category, output)
+            except Exception as e:
+                logger.warning(f"Failed to save {self.category} snapshot: {e}")
+        return {**await self._store_documents(state, output), 'refreshed_categories': [self.category]}
+
+    async def _store_documents(self, state: ResearchState, output: Dict[str, Any]) -> Dict[str, Any]:
+        """Move document text into the job's document store; the graph state keeps ids."""
+        job_id = state.get('job_id')
+        curated_field = f'curated_{self.data_field}'
+        return {
+            **output,
+            self.data_field: await document_store.put_documents(job_id, output[self.data_field]),
+            curated_field: await document_store.put_documents(job_id, output[curated_field])
+        }
+
+    async def _merge_site_scrape(self, state: ResearchState) -> None:
+        """Add the company website, extracted while the analyst was searching, to the category data."""
+        site_scrape = await self.grounding.wait_for_site_scrape(state)
+        if not site_scrape:
+            return
+        state['site_scrape'] = site_scrape
+        # The website goes first, as the analysts put it when grounding finished before them
+        state[self.data_field] = {**self.analyst.site_document(state, site_scrape), **state[self.data_field]}
+
+    async def _reuse_snapshot(self, state: ResearchState) -> Dict[str, Any]:
+        """Return the previous run's output for this category if it has not expired."""
+        company = state.get('company')
+        try:
+            snapshot = await snapshot_store.load_fresh_category(company, self.category)
+        except Exception as e:
+            logger.warning(f"Failed to load {self.category} snapshot for {company}: {e}")
+            return {}
+        if not snapshot or not snapshot.get(self.briefing_key):
+            return {}
+
+        age_hours = snapshot['age'] / 3600
+        logger.info(f"Reusing {self.category} data for {company} ({age_hours:.1f}h old)")
+        if websocket_manager := state.get('websocket_manager'):
+            if job_id := state.get('job_id'):
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="category_reused",
+                    message=f"Reusing {self.category} research from {age_hours:.1f} hours ago",
+                    result={
+                        "step": "Refresh",
+                        "category": self.category,
+                        "age_hours": round(age_hours, 1)
+                    }
+                )
+        curated_field = f'curated_{self.data_field}'
+        output = {
+            self.data_field: snapshot.get(self.data_field, {}),
+            curated_field: snapshot.get(curated_field, {}),
+            self.briefing_key: snapshot[self.briefing_key]
+        }
+        # Claimed first, so the categories researched afresh brief these URLs as snippets
+        if job_urls := url_registry.for_job(state.get('job_id')):
+            for url in output[curated_field]:
+                job_urls.claim(url, self.category)
+        return {**await self._store_documents(state, output), 'refreshed_categories': []}
@@ -2,5 +2,6 @@ from .financial import FinancialAnalyst
 from .news import NewsScanner
 from .industry import IndustryAnalyzer
 from .company import CompanyAnalyzer
+from .planner import QueryPlanner
 
-__all__ = ["FinancialAnalyst", "NewsScanner", "IndustryAnalyzer", "CompanyAnalyzer"] 
\ No newline at end of file
+__all__ = ["FinancialAnalyst", "NewsScanner", "IndustryAnalyzer", "CompanyAnalyzer", "QueryPlanner"] 
\ No newline at end of file
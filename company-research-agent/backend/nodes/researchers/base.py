@@ -1,9 +1,15 @@
-import os
 from datetime import datetime
-from openai import AsyncOpenAI
-from tavily import AsyncTavilyClient
 from ...classes import ResearchState
-from typing import Dict, Any, List
+from ...services.batch import search_key, shared_call
+from ...services.clients import get_client_registry
+from ...services.query_cache import query_cache
+from ...services.query_dedup import query_dedup
+from ...services.search_cache import search_cache
+from ...services.search_executor import search_executor
+from ...services.search_strategy import search_strategy
+from ...services.tracing import span, traced
+from ...utils.deadline import expired, scaled
+from typing import Dict, Any, AsyncIterator, List, Tuple
 import logging
 from ...utils.references import clean_title
 from ...utils.local_data import LocalDataManager
@@ -22,19 +28,15 @@ class BaseResearcher:
             self.local_data_manager = LocalDataManager()
             self.text_linker = TextReferenceLinker(data_dir=self.local_data_manager.data_dir)
         else:
-            # Tavily API 配置（生产环境使用）
-            tavily_key = os.getenv("TAVILY_API_KEY")
-            if not tavily_key:
-                raise ValueError("TAVILY_API_KEY environment variable is not set")
-            self.tavily_client = AsyncTavilyClient(api_key=tavily_key)
+            # Tavily API 配置（生产环境使用，共享连接池）
+            self.tavily_client = get_client_registry().tavily
             self.text_linker = TextReferenceLinker()  # 不传入本地数据目录
             
-        # OpenAI API 配置
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if not openai_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.openai_client = AsyncOpenAI(api_key=openai_key, base_url="https://openrouter.ai/api/v1")
+        # OpenAI API 配置（共享连接池）
+        self.openai_client = get_client_registry().openai
         self._analyst_type = None
+        # 批量查询规划器（由 NodePool 设置），一次 LLM 调用生成所有分析师的查询
+        self.query_planner = None
 
     @property
     def analyst_type(self) -> str:
@@ -46,114 +48,143 @@ class BaseResearcher:
     def analyst_type(self, value: str):
         self._analyst_type = value
 
-    async def generate_queries(self, state: Dict, prompt: str) -> List[str]:
+    # Prompt describing what this analyst searches for
+    query_prompt = ""
+
+    # Query recorded on the company website document (formatted with {company})
+    site_scrape_query = 'Company overview and information about {company}'
+
+    def site_document(self, state: ResearchState, site_scrape: Any) -> Dict[str, Dict[str, Any]]:
+        """The company website as a document of this analyst's data, keyed by its URL."""
+        company = state.get('company', 'Unknown Company')
+        return {
+            state.get('company_url', 'company-website'): {
+                'title': company,
+                'raw_content': site_scrape,
+                'query': self.site_scrape_query.format(company=company)
+            }
+        }
+
+    async def generate_queries_stream(self, state: Dict, prompt: str) -> AsyncIterator[str]:
+        """Yield each search query as soon as the model finishes writing its line.
+
+        Cached and planned queries are yielded at once. At most 4 queries
+        (fewer under deadline pressure) are produced; on failure an error
+        update is sent and the stream ends.
+        """
         company = state.get("company", "Unknown Company")
         industry = state.get("industry", "Unknown Industry")
         hq = state.get("hq", "Unknown HQ")
         current_year = datetime.now().year
         websocket_manager = state.get('websocket_manager')
         job_id = state.get('job_id')
-        
-        try:
-            logger.info(f"Generating queries for {company} as {self.analyst_type}")
-            
-            response = await self.openai_client.chat.completions.create(
-                model="openai/gpt-4.1-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are researching {company}, a company in the {industry} industry."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Researching {company} on {datetime.now().strftime("%B %d, %Y")}.
-{self._format_query_prompt(prompt, company, hq, current_year)}"""
+        # Fewer queries when the job is behind its deadline
+        query_count = scaled(state, "research", 4)
+
+        # 同一公司、行业和分析师在同一日期区间内的查询直接复用缓存
+        if cached := await query_cache.get(state, self.analyst_type, prompt, query_count):
+            logger.info(f"Using cached queries for {self.analyst_type}: {cached}")
+            await self._send_queries(cached, websocket_manager, job_id)
+            for query in cached:
+                yield query
+            return
+
+        if self.query_planner and (planned := await self.query_planner.queries_for(state, self.analyst_type)):
+            logger.info(f"Using planned queries for {self.analyst_type}: {planned}")
+            await self._send_queries(planned, websocket_manager, job_id)
+            await query_cache.put(state, self.analyst_type, prompt, query_count, planned)
+            for query in planned:
+                yield query
+            return
+
+        queries = []
+        response = None
+        failed = False
+
+        async def complete(query: str, message: str) -> None:
+            queries.append(query)
+            if websocket_manager and job_id:
+                await websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="query_generated",
+                    message=message,
+                    result={
+                        "query": query,
+                        "query_number": len(queries),
+                        "category": self.analyst_type,
+                        "is_complete": True
                     }
-                ],
-                temperature=0,
-                max_tokens=4096,
-                stream=True
-            )
-            
-            queries = []
-            current_query = ""
-            current_query_number = 1
-
-            async for chunk in response:
-                if chunk.choices[0].finish_reason == "stop":
-                    break
-                    
-                content = chunk.choices[0].delta.content
-                if content:
-                    current_query += content
-                    
-                    # Stream the current state to the UI.
-                    if websocket_manager and job_id:
-                        await websocket_manager.send_status_update(
-                            job_id=job_id,
-                            status="query_generating",
-                            message="Generating research query",
-                            result={
-                                "query": current_query,
-                                "query_number": current_query_number,
-                                "category": self.analyst_type,
-                                "is_complete": False
-                            }
-                        )
-                    
-                    # If a newline is detected, treat it as a complete query.
-                    if '\n' in current_query:
-                        parts = current_query.split('\n')
-                        current_query = parts[-1]  # The last part is the start of the next query.
-                        
-                        for query in parts[:-1]:
-                            query = query.strip()
-                            if query:
-                                queries.append(query)
-                                if websocket_manager and job_id:
-                                    await websocket_manager.send_status_update(
-                                        job_id=job_id,
-                                        status="query_generated",
-                                        message="Generated new research query",
-                                        result={
-                                            "query": query,
-                                            "query_number": len(queries),
-                                            "category": self.analyst_type,
-                                            "is_complete": True
-                                        }
-                                    )
-                                current_query_number += 1
-
-            # Add any remaining query (even if not newline terminated)
-            if current_query.strip():
-                query = current_query.strip()
-                queries.append(query)
-                if websocket_manager and job_id:
-                    await websocket_manager.send_status_update(
-                        job_id=job_id,
-                        status="query_generated",
-                        message="Generated final research query",
-                        result={
-                            "query": query,
-                            "query_number": len(queries),
-                            "category": self.analyst_type,
-                            "is_complete": True
+                )
+
+        try:
+            with span("generate_queries_llm", analyst=self.analyst_type):
+                logger.info(f"Generating queries for {company} as {self.analyst_type}")
+
+                response = await self.openai_client.chat.completions.create(
+                    model="openai/gpt-4.1-mini",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": f"You are researching {company}, a company in the {industry} industry."
+                        },
+                        {
+                            "role": "user",
+                            "content": f"""Researching {company} on {datetime.now().strftime("%B %d, %Y")}.
+{self._format_query_prompt(prompt, company, hq, current_year, query_count)}"""
                         }
-                    )
-                current_query_number += 1
-            
-            logger.info(f"Generated {len(queries)} queries for {self.analyst_type}: {queries}")
+                    ],
+                    temperature=0,
+                    max_tokens=4096,
+                    stream=True
+                )
+
+                current_query = ""
+                async for chunk in response:
+                    if chunk.choices[0].finish_reason == "stop" or len(queries) >= query_count:
+                        break
+
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        current_query += content
 
+                        # Stream the current state to the UI.
+                        if websocket_manager and job_id:
+                            await websocket_manager.send_status_update(
+                                job_id=job_id,
+                                status="query_generating",
+                                message="Generating research query",
+                                result={
+                                    "query": current_query,
+                                    "query_number": len(queries) + 1,
+                                    "category": self.analyst_type,
+                                    "is_complete": False
+                                }
+                            )
+
+                        # If a newline is detected, treat it as a complete query and hand it
+                        # to the caller right away, while the model keeps writing the next one.
+                        if '\n' in current_query:
+                            parts = current_query.split('\n')
+                            current_query = parts[-1]  # The last part is the start of the next query.
+
+                            for query in parts[:-1]:
+                                query = query.strip()
+                                if query and len(queries) < query_count:
+                                    await complete(query, "Generated new research query")
+                                    yield query
+
+                # Add any remaining query (even if not newline terminated)
+                if current_query.strip() and len(queries) < query_count:
+                    query = current_query.strip()
+                    await complete(query, "Generated final research query")
+                    yield query
+
+            logger.info(f"Generated {len(queries)} queries for {self.analyst_type}: {queries}")
             if not queries:
                 raise ValueError(f"No queries generated for {company}")
 
-            # Limit to at most 4 queries.
-            queries = queries[:4]
-            logger.info(f"Final queries for {self.analyst_type}: {queries}")
-            
-            return queries
-            
         except Exception as e:
+            failed = True
             logger.error(f"Error generating queries for {company}: {e}")
             if websocket_manager and job_id:
                 await websocket_manager.send_status_update(
@@ -162,15 +193,56 @@ class BaseResearcher:
                     message=f"Failed to generate research queries: {str(e)}",
                     error=f"Query generation failed: {str(e)}"
                 )
-            return []
+        finally:
+            # Release the pooled connection; breaking out of the loop leaves the stream open
+            if response is not None:
+                await response.close()
+            # Also when the caller closed the stream early: keep the queries generated so far
+            if queries and not failed:
+                await query_cache.put(state, self.analyst_type, prompt, query_count, queries)
+
+    @traced("generate_and_search")
+    async def generate_and_search(self, state: ResearchState, prompt: str) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+        """Generate queries and search each one as soon as it is written.
+
+        Returns the queries and {query: documents}, each document tagged
+        with its query, so the search for the first query overlaps with the
+        model writing the later ones.
+        """
+        results = await search_executor.run_stream(
+            self.generate_queries_stream(state, prompt),
+            lambda query: self.search_documents(state, [query]),
+            name=self.analyst_type
+        )
+        for query, documents in results.items():
+            for doc in documents.values():
+                doc['query'] = query
+        return list(results), results
 
-    def _format_query_prompt(self, prompt, company, hq, year):
+    async def _send_queries(self, queries: List[str], websocket_manager=None, job_id=None) -> None:
+        """Report planned or cached queries the same way streamed ones are reported."""
+        if not (websocket_manager and job_id):
+            return
+        for number, query in enumerate(queries, start=1):
+            await websocket_manager.send_status_update(
+                job_id=job_id,
+                status="query_generated",
+                message="Generated new research query",
+                result={
+                    "query": query,
+                    "query_number": number,
+                    "category": self.analyst_type,
+                    "is_complete": True
+                }
+            )
+
+    def _format_query_prompt(self, prompt, company, hq, year, count=4):
         return f"""{prompt}
 
         Important Guidelines:
         - Focus ONLY on {company}-specific information
         - Make queries very brief and to the point
-        - Provide exactly 4 search queries (one per line), with no hyphens or dashes
+        - Provide exactly {count} search queries (one per line), with no hyphens or dashes
         - DO NOT make assumptions about the industry - use only the provided industry information"""
 
     def _fallback_queries(self, company, year):
@@ -181,51 +253,6 @@ class BaseResearcher:
             f"{company} industry analysis {year}"
         ]
 
-    async def search_single_query(self, query: str, websocket_manager=None, job_id=None) -> Dict[str, Any]:
-        """Execute a single search query with proper error handling."""
-        try:
-            if self.use_local_data:
-                # 使用本地数据模式
-                results = self.local_data_manager.get_search_results(query)
-                if results:
-                    # 将搜索结果添加到文本链接器
-                    for result in results:
-                        self.text_linker.add_data_source(
-                            result.get('content', ''),
-                            result.get('url', ''),
-                            result.get('title', ''),
-                            result.get('score', 0.0)
-                        )
-                    return results
-            else:
-                # 使用 Tavily API 模式
-                search_result = await self.tavily_client.search(
-                    query=query,
-                    search_depth="advanced",
-                    include_answer=True,
-                    include_raw_content=True
-                )
-                
-                if search_result and 'results' in search_result:
-                    # 将 Tavily 搜索结果添加到文本链接器
-                    self.text_linker.add_tavily_results(search_result['results'])
-                    return search_result['results']
-                    
-        except Exception as e:
-            logger.error(f"Error during search execution: {e}")
-            if websocket_manager and job_id:
-                await websocket_manager.send_status_update(
-                    job_id=job_id,
-                    status="query_error",
-                    message=f"Search failed: {str(e)}",
-                    result={
-                        "step": "Searching",
-                        "error": str(e)
-                    }
-                )
-            return {}
-        return {}
-
     def _normalize_query(self, query: str) -> str:
         """标准化查询名称，确保与文件名格式一致
         
@@ -246,6 +273,7 @@ class BaseResearcher:
         # 确保名称不为空
         return query or "unknown"
 
+    @traced("search_documents")
     async def search_documents(self, state: ResearchState, queries: List[str]) -> Dict[str, Any]:
         websocket_manager = state.get('websocket_manager')
         job_id = state.get('job_id')
@@ -255,6 +283,10 @@ class BaseResearcher:
             logger.error("No valid queries to search")
             return {}
 
+        if expired(state):
+            logger.warning(f"Deadline passed, skipping {len(queries)} {self.analyst_type} queries")
+            return {}
+
         if websocket_manager and job_id:
             await websocket_manager.send_status_update(
                 job_id=job_id,
@@ -270,10 +302,9 @@ class BaseResearcher:
 
         merged_docs = {}
         if not self.use_local_data:  # 使用 Tavily API 模式
+            # 搜索深度与结果数量由 search_strategy 按查询决定
             search_params = {
-                "search_depth": "advanced",  # 使用高级搜索深度
-                "include_raw_content": True,
-                "max_results": 10  # 增加结果数量
+                "include_raw_content": True
             }
             if self.analyst_type == "news_analyst":
                 search_params["topic"] = "news"
@@ -291,10 +322,28 @@ class BaseResearcher:
                     }
                 )
                 
-            search_tasks = [
-                self.tavily_client.search(query, **search_params)
-                for query in queries
-            ]
+            # Near-duplicates of queries already searched in this job (by any analyst) with the
+            # same parameters share their results
+            job_queries = query_dedup.for_job(job_id, company)
+
+            # Identical searches from other companies in the same batch run only once,
+            # and repeated searches across runs are answered from the search cache
+            def run_search(query: str):
+                def run(params: Dict[str, Any]):
+                    def search():
+                        return shared_call(
+                            "search",
+                            search_key(query, params),
+                            lambda: search_cache.search(
+                                query, params, lambda: self.tavily_client.search(query, **params)
+                            )
+                        )
+                    return job_queries.search(query, params, search) if job_queries else search()
+
+                # Basic search first, advanced only when too few results are relevant
+                return search_strategy.search(self.analyst_type, query, search_params, run)
+
+            search_tasks = [run_search(query) for query in queries]
             
             try:
                 search_results = await asyncio.gather(*search_tasks, return_exceptions=True)
@@ -319,6 +368,9 @@ class BaseResearcher:
                                 "source": "tavily_api",
                                 "score": doc.get("score", 0.0)
                             }
+                            # 保留搜索返回的全文，Enricher 只为缺失或被截断的文档再调用 extract
+                            if raw_content := doc.get("raw_content"):
+                                merged_docs[url]["raw_content"] = raw_content
                             
             except Exception as e:
                 logger.error(f"Error during parallel search execution: {e}")
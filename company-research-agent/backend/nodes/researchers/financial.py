@@ -7,6 +7,16 @@ from .base import BaseResearcher
 logger = logging.getLogger(__name__)
 
 class FinancialAnalyst(BaseResearcher):
+    # 查询生成提示词（批量查询规划时也由 QueryPlanner 使用）
+    query_prompt = """
+    Generate queries on the financial analysis of {company} in the {industry} industry such as:
+    - Fundraising history and valuation
+    - Financial statements and key metrics
+    - Revenue and profit sources
+    """
+
+    site_scrape_query = 'Financial information on {company}'
+
     def __init__(self, use_local_data: bool = False) -> None:
         # 模式切换说明：
         # - use_local_data=True: 使用本地数据模式（用于测试）
@@ -22,14 +32,8 @@ class FinancialAnalyst(BaseResearcher):
         
         try:
             # 生成搜索查询（本地数据和 API 模式都使用相同的查询生成逻辑）
-            queries = await self.generate_queries(
-                state,
-                """
-                Generate queries on the financial analysis of {company} in the {industry} industry such as:
-                - Fundraising history and valuation
-                - Financial statements and key metrics
-                - Revenue and profit sources
-                """)
+            # 查询一生成就开始搜索，搜索与模型继续输出后续查询并行
+            queries, search_results = await self.generate_and_search(state, self.query_prompt)
             
             # 添加查询消息（本地数据和 API 模式都显示相同的查询信息）
             subqueries_msg = "🔍 Subqueries for financial analysis:\n" + "\n".join([f"• {query}" for query in queries])
@@ -54,19 +58,12 @@ class FinancialAnalyst(BaseResearcher):
             # 处理网站抓取数据（本地数据和 API 模式都支持）
             financial_data = {}
             if site_scrape := state.get('site_scrape'):
-                company_url = state.get('company_url', 'company-website')
-                financial_data[company_url] = {
-                    'title': state.get('company', 'Unknown Company'),
-                    'raw_content': site_scrape,
-                    'query': f'Financial information on {company}'
-                }
+                financial_data.update(self.site_document(state, site_scrape))
 
             # 执行搜索（根据模式自动选择本地数据或 API）
-            for query in queries:
-                documents = await self.search_documents(state, [query])
-                for url, doc in documents.items():
-                    doc['query'] = query
-                    financial_data[url] = doc
+            # 文档仍按查询归属
+            for documents in search_results.values():
+                financial_data.update(documents)
 
             # 最终状态更新（本地数据和 API 模式使用相同的状态更新逻辑）
             completion_msg = f"Completed analysis with {len(financial_data)} documents using {'local data' if self.use_local_data else 'Tavily API'}"
@@ -4,6 +4,16 @@ from ...classes import ResearchState
 from .base import BaseResearcher
 
 class NewsScanner(BaseResearcher):
+    # 查询生成提示词（批量查询规划时也由 QueryPlanner 使用）
+    query_prompt = """
+    Generate queries on the recent news coverage of {company} such as:
+    - Recent company announcements
+    - Press releases
+    - New partnerships
+    """
+
+    site_scrape_query = 'News and announcements about {company}'
+
     def __init__(self, use_local_data: bool = False) -> None:
         # 模式切换说明：
         # - use_local_data=True: 使用本地数据模式（用于测试）
@@ -17,12 +27,8 @@ class NewsScanner(BaseResearcher):
         msg = [f"📰 News Scanner analyzing {company}"]
         
         # 生成搜索查询（本地数据和 API 模式都使用相同的查询生成逻辑）
-        queries = await self.generate_queries(state, """
-        Generate queries on the recent news coverage of {company} such as:
-        - Recent company announcements
-        - Press releases
-        - New partnerships
-        """)
+        # 查询一生成就开始搜索，搜索与模型继续输出后续查询并行
+        queries, search_results = await self.generate_and_search(state, self.query_prompt)
 
         # 添加查询消息（本地数据和 API 模式都显示相同的查询信息）
         subqueries_msg = "🔍 Subqueries for news analysis:\n" + "\n".join([f"• {query}" for query in queries])
@@ -35,21 +41,13 @@ class NewsScanner(BaseResearcher):
         # 处理网站抓取数据（本地数据和 API 模式都支持）
         if site_scrape := state.get('site_scrape'):
             msg.append("\n📊 Including site scrape data in company analysis...")
-            company_url = state.get('company_url', 'company-website')
-            news_data[company_url] = {
-                'title': state.get('company', 'Unknown Company'),
-                'raw_content': site_scrape,
-                'query': f'News and announcements about {company}'
-            }
+            news_data.update(self.site_document(state, site_scrape))
         
         # 执行搜索（根据模式自动选择本地数据或 API）
         try:
-            for query in queries:
-                documents = await self.search_documents(state, [query])
-                if documents:
-                    for url, doc in documents.items():
-                        doc['query'] = query
-                        news_data[url] = doc
+            # 文档仍按查询归属
+            for documents in search_results.values():
+                news_data.update(documents)
             
             msg.append(f"\n✓ Found {len(news_data)} documents")
             if websocket_manager := state.get('websocket_manager'):
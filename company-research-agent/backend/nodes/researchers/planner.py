@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import re
+
+from ...classes import ResearchState
+from ...services.tracing import traced
+from ...utils.deadline import scaled
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlanner:
+    """Plans the search queries of every analyst with one LLM call per job.
+
+    The first analyst of a job to ask starts the plan; the others await the
+    same call and take their share. The plan is streamed, and each analyst
+    gets its queries as soon as its category's list is complete, so its
+    searches start while the model is still writing the other categories.
+    QUERY_PLANNING_MODE=per_analyst turns planning off (each analyst
+    generates its own queries); when the plan fails an analyst falls back
+    to its own query generation.
+    """
+
+    def __init__(self, openai_client, analysts: List[Any]):
+        self.openai_client = openai_client
+        # analyst_type -> query prompt
+        self.prompts: Dict[str, str] = {analyst.analyst_type: analyst.query_prompt for analyst in analysts}
+        self.enabled = os.getenv("QUERY_PLANNING_MODE", "batched").lower() == "batched"
+        # job_id -> planning call, and its queries (analyst_type -> future), kept until the job is released
+        self._plans: Dict[str, asyncio.Task] = {}
+        self._queries: Dict[str, Dict[str, asyncio.Future]] = {}
+
+    async def queries_for(self, state: ResearchState, analyst_type: str) -> Optional[List[str]]:
+        """The analyst's planned queries, or None when it should generate its own."""
+        job_id = state.get('job_id')
+        if not self.enabled or not job_id or analyst_type not in self.prompts:
+            return None
+
+        if (queries := self._queries.get(job_id)) is None:
+            loop = asyncio.get_running_loop()
+            queries = {planned_type: loop.create_future() for planned_type in self.prompts}
+            self._queries[job_id] = queries
+            self._plans[job_id] = asyncio.create_task(self.plan(state, queries))
+        try:
+            planned = await asyncio.shield(queries[analyst_type])
+        except asyncio.CancelledError:
+            if queries[analyst_type].cancelled() and not asyncio.current_task().cancelling():
+                logger.warning(f"Query planning cancelled for job {job_id}, {analyst_type} generates its own")
+                return None
+            raise
+        except Exception as e:
+            logger.warning(f"Query planning failed for job {job_id}, {analyst_type} generates its own: {e}")
+            return None
+        return planned or None
+
+    def release(self, job_id: str) -> None:
+        """Cancel a finished, failed or cancelled job's planning call and forget its plan."""
+        self._queries.pop(job_id, None)
+        if (plan := self._plans.pop(job_id, None)) is not None and not plan.done():
+            logger.info(f"Cancelling query planning of job {job_id}")
+            plan.cancel()
+
+    @staticmethod
+    def _clean(planned: Any, query_count: int) -> List[str]:
+        if not isinstance(planned, list):
+            return []
+        return [q.strip() for q in planned if isinstance(q, str) and q.strip()][:query_count]
+
+    @traced("plan_queries")
+    async def plan(self, state: ResearchState, queries: Dict[str, asyncio.Future]) -> None:
+        """Stream the plan, resolving each analyst's future once its query list is complete."""
+        try:
+            await self._plan(state, queries)
+        except BaseException as e:
+            for future in queries.values():
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                    future.exception()
+                else:
+                    future.cancel()
+            raise
+        # Categories the model left out generate their own queries
+        for future in queries.values():
+            if not future.done():
+                future.set_result([])
+
+    async def _plan(self, state: ResearchState, queries: Dict[str, asyncio.Future]) -> None:
+        company = state.get("company", "Unknown Company")
+        industry = state.get("industry", "Unknown Industry")
+        hq = state.get("hq", "Unknown HQ")
+        # Fewer queries when the job is behind its deadline
+        query_count = scaled(state, "research", 4)
+
+        sections = "\n\n".join(
+            f"## {analyst_type}\n{prompt.strip()}" for analyst_type, prompt in self.prompts.items()
+        )
+        logger.info(f"Planning queries for {company} ({len(self.prompts)} categories, one request)")
+        response = await self.openai_client.chat.completions.create(
+            model="openai/gpt-4.1-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"You are researching {company}, a company in the {industry} industry."
+                },
+                {
+                    "role": "user",
+                    "content": f"""Researching {company} on {datetime.now().strftime("%B %d, %Y")}.
+Plan the web search queries for each research category below.
+
+{sections}
+
+Important Guidelines:
+- Focus ONLY on {company}-specific information (headquarters: {hq})
+- Make queries very brief and to the point
+- Provide exactly {query_count} search queries per category, with no hyphens or dashes
+- DO NOT make assumptions about the industry - use only the provided industry information
+
+Respond with a JSON object whose keys are the category names ({", ".join(self.prompts)}) and whose values are lists of query strings."""
+                }
+            ],
+            temperature=0,
+            max_tokens=4096,
+            response_format={"type": "json_object"},
+            stream=True
+        )
+
+        decoder = json.JSONDecoder()
+        content = ""
+
+        def resolve_complete() -> None:
+            # A category's list is complete once it decodes on its own
+            for analyst_type, future in queries.items():
+                if future.done():
+                    continue
+                if not (match := re.search(rf'"{re.escape(analyst_type)}"\s*:\s*(?=\[)', content)):
+                    continue
+                try:
+                    planned, _ = decoder.raw_decode(content, match.end())
+                except ValueError:
+                    continue
+                future.set_result(self._clean(planned, query_count))
+                logger.info(f"Planned queries for {analyst_type}: {future.result()}")
+
+        try:
+            async for chunk in response:
+                if chunk.choices and (delta := chunk.choices[0].delta.content):
+                    content += delta
+                    resolve_complete()
+        finally:
+            await response.close()
+
+        plan = json.loads(content)
+        for analyst_type, future in queries.items():
+            if not future.done():
+                future.set_result(self._clean(plan.get(analyst_type), query_count))
+        logger.info(f"Planned queries for {company} ({len(content)} characters)")
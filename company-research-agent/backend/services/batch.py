@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Batch whose job is currently running (inherited by the graph's node tasks)
+_current_batch: ContextVar[Optional["BatchContext"]] = ContextVar("current_batch", default=None)
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class BatchContext:
+    """Shared state for the jobs of one batch research request.
+
+    Identical Tavily searches and extractions issued by any job of the batch
+    run once: concurrent callers await the same in-flight request and later
+    callers reuse its result until the batch finishes. Per-company progress
+    and batch totals are broadcast on the batch id's WebSocket channel.
+    """
+
+    def __init__(self, batch_id: str, jobs: Dict[str, str], websocket_manager=None):
+        self.batch_id = batch_id
+        self.websocket_manager = websocket_manager
+        self.created_at = time.time()
+        # job_id -> {"company", "status"}
+        self.jobs: Dict[str, Dict[str, Any]] = {
+            job_id: {"company": company, "status": "queued"} for job_id, company in jobs.items()
+        }
+        self._shared: Dict[Hashable, asyncio.Future] = {}
+        self.shared_stats = {"requests": 0, "deduplicated": 0}
+
+    async def run(self, coro: Awaitable[Any]) -> Any:
+        """Await a job's coroutine with this batch as the current batch."""
+        token = _current_batch.set(self)
+        try:
+            return await coro
+        finally:
+            _current_batch.reset(token)
+
+    async def shared(self, kind: str, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `factory` once per (kind, key) within the batch; other callers share the result."""
+        cache_key = (kind, key)
+        self.shared_stats["requests"] += 1
+        if (future := self._shared.get(cache_key)) is not None:
+            self.shared_stats["deduplicated"] += 1
+            metrics.inc("batch_dedup_hits", kind=kind)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The job that owned the request was cancelled, not this one: run it ourselves
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.shared(kind, key, factory)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._shared[cache_key] = future
+        try:
+            result = await factory()
+        except BaseException as e:
+            # Let waiting callers see the failure, but retry on the next call
+            self._shared.pop(cache_key, None)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody is waiting
+            else:
+                future.cancel()
+            raise
+        future.set_result(result)
+        return result
+
+    @property
+    def finished(self) -> bool:
+        return all(job["status"] in FINISHED_STATUSES for job in self.jobs.values())
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        done = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        return {
+            "batch_id": self.batch_id,
+            "total": len(self.jobs),
+            "completed": counts.get("completed", 0),
+            "failed": counts.get("failed", 0),
+            "cancelled": counts.get("cancelled", 0),
+            "running": counts.get("processing", 0),
+            "queued": counts.get("queued", 0),
+            "progress": round(done / len(self.jobs), 3) if self.jobs else 1.0,
+            "shared_requests": dict(self.shared_stats),
+            "jobs": {job_id: dict(job) for job_id, job in self.jobs.items()}
+        }
+
+    async def update_job(self, job_id: str, status: str) -> None:
+        """Record a job's status and broadcast the batch progress."""
+        if job_id not in self.jobs:
+            return
+        self.jobs[job_id]["status"] = status
+        if self.finished:
+            logger.info(f"Batch {self.batch_id} finished: {json.dumps(self.shared_stats)}")
+            self._shared.clear()
+        if not self.websocket_manager:
+            return
+        summary = self.summary()
+        try:
+            await self.websocket_manager.send_status_update(
+                job_id=self.batch_id,
+                status="batch_completed" if self.finished else "batch_progress",
+                message=f"{self.jobs[job_id]['company']}: {status} "
+                        f"({summary['completed'] + summary['failed'] + summary['cancelled']}/{summary['total']} done)",
+                result=summary
+            )
+        except Exception as e:
+            logger.warning(f"Failed to send progress for batch {self.batch_id}: {e}")
+
+
+def current_batch() -> Optional[BatchContext]:
+    return _current_batch.get()
+
+
+async def shared_call(kind: str, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Deduplicate a provider call across the current batch (runs directly outside a batch)."""
+    batch = current_batch()
+    if batch is None:
+        return await factory()
+    return await batch.shared(kind, key, factory)
+
+
+def search_key(query: str, params: Dict[str, Any]) -> str:
+    return json.dumps([" ".join(query.lower().split()), params], sort_keys=True)
+
+
+class BatchRegistry:
+    """Keeps running and recently finished batches (oldest finished evicted first)."""
+
+    def __init__(self, retention: int = 50):
+        self.retention = retention
+        self._batches: Dict[str, BatchContext] = {}
+
+    def add(self, batch: BatchContext) -> None:
+        self._batches[batch.batch_id] = batch
+        finished = [b for b in self._batches.values() if b.finished]
+        for old in sorted(finished, key=lambda b: b.created_at)[:max(0, len(self._batches) - self.retention)]:
+            self._batches.pop(old.batch_id, None)
+
+    def get(self, batch_id: str) -> Optional[BatchContext]:
+        return self._batches.get(batch_id)
+
+    def for_job(self, job_id: str) -> Optional[BatchContext]:
+        return next((batch for batch in self._batches.values() if job_id in batch.jobs), None)
+
+    def __contains__(self, batch_id: str) -> bool:
+        return batch_id in self._batches
+
+
+batch_registry = BatchRegistry()
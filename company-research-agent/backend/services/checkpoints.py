@@ -0,0 +1,204 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Live objects that only make sense inside the running process
+_TRANSIENT_KEYS = ("websocket_manager",)
+
+
+def _serialize(output: Dict[str, Any]) -> str:
+    data = {key: value for key, value in output.items() if key not in _TRANSIENT_KEYS}
+    if isinstance(data.get("messages"), list):
+        data["messages"] = messages_to_dict(
+            [m for m in data["messages"] if isinstance(m, BaseMessage)]
+        )
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _deserialize(payload: str) -> Dict[str, Any]:
+    data = json.loads(payload)
+    if isinstance(data.get("messages"), list):
+        data["messages"] = messages_from_dict(data["messages"])
+    return data
+
+
+class SQLiteStore:
+    """Small thread-safe SQLite wrapper; queries run off the event loop."""
+
+    SCHEMA: Tuple[str, ...] = ()
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return rows
+
+    def _execute_many(self, sql: str, rows: List[Tuple]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(sql, rows)
+            conn.commit()
+
+    async def _run(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def _run_many(self, sql: str, rows: List[Tuple]) -> None:
+        await asyncio.to_thread(self._execute_many, sql, rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CheckpointStore(SQLiteStore):
+    """SQLite-backed record of research jobs and their completed node outputs.
+
+    Every graph node's output is saved under (job_id, node) as soon as the
+    node finishes. When a job is re-run with the same job_id (e.g. resumed
+    after a restart) nodes that already completed return their saved output
+    instead of repeating their searches and LLM calls.
+
+    CHECKPOINT_DB sets the database path (default checkpoints/research.db);
+    set CHECKPOINTS_ENABLED=false to turn checkpointing off.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            request TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS node_outputs (
+            job_id TEXT NOT NULL,
+            node TEXT NOT NULL,
+            output TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (job_id, node)
+        )
+        """
+    )
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("CHECKPOINTS_ENABLED", "true").lower() not in ("0", "false", "no")
+        super().__init__(
+            path or os.getenv("CHECKPOINT_DB", os.path.join("checkpoints", "research.db")),
+            enabled
+        )
+
+    async def register_job(self, job_id: str, request: Dict[str, Any]) -> None:
+        """Record a newly submitted job so it can be resumed after a restart."""
+        if not self.enabled:
+            return
+        now = time.time()
+        await self._run(
+            "INSERT OR REPLACE INTO jobs (job_id, request, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, json.dumps(request), "queued", now, now)
+        )
+
+    async def set_status(self, job_id: str, status: str) -> None:
+        if not self.enabled:
+            return
+        await self._run(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+            (status, time.time(), job_id)
+        )
+
+    async def finish_job(self, job_id: str, status: str) -> None:
+        """Mark a job finished and drop its node outputs; it will not be resumed."""
+        if not self.enabled:
+            return
+        await self.set_status(job_id, status)
+        await self._run("DELETE FROM node_outputs WHERE job_id = ?", (job_id,))
+
+    async def incomplete_jobs(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Jobs that were queued or running when the process last stopped."""
+        if not self.enabled:
+            return []
+        rows = await self._run(
+            "SELECT job_id, request FROM jobs WHERE status IN ('queued', 'processing') ORDER BY created_at"
+        )
+        return [(job_id, json.loads(request)) for job_id, request in rows]
+
+    async def save_node(self, job_id: str, node: str, output: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        await self._run(
+            "INSERT OR REPLACE INTO node_outputs (job_id, node, output, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, node, _serialize(output), time.time())
+        )
+
+    async def load_node(self, job_id: str, node: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        rows = await self._run(
+            "SELECT output FROM node_outputs WHERE job_id = ? AND node = ?",
+            (job_id, node)
+        )
+        return _deserialize(rows[0][0]) if rows else None
+
+
+checkpoint_store = CheckpointStore()
+
+
+def checkpointed_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node so its output is saved, and replayed when the job resumes."""
+
+    @functools.wraps(func)
+    async def wrapper(state, *args, **kwargs):
+        job_id = state.get("job_id")
+        if not job_id or not checkpoint_store.enabled:
+            return await func(state, *args, **kwargs)
+
+        try:
+            saved = await checkpoint_store.load_node(job_id, name)
+        except Exception as e:
+            logger.warning(f"Failed to load checkpoint for {name} (job {job_id}): {e}")
+            saved = None
+        if saved is not None:
+            logger.info(f"Restored {name} output for job {job_id} from checkpoint")
+            return saved
+
+        output = await func(state, *args, **kwargs)
+        try:
+            await checkpoint_store.save_node(job_id, name, output)
+        except Exception as e:
+            logger.warning(f"Failed to save checkpoint for {name} (job {job_id}): {e}")
+        return output
+
+    return wrapper
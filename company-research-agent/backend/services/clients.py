@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from tavily import AsyncTavilyClient
+
+from .ratelimit import RateLimitedTransport
+from .tracing import TracingTransport
+
+logger = logging.getLogger(__name__)
+
+TAVILY_BASE_URL = "https://api.tavily.com"
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _SharedClientContext:
+    """Async context manager that hands out a shared client without closing it."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def __aenter__(self) -> httpx.AsyncClient:
+        return self._client
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+class PooledTavilyClient(AsyncTavilyClient):
+    """AsyncTavilyClient that reuses one keep-alive connection pool.
+
+    The upstream client opens (and closes) a new httpx.AsyncClient for every
+    request; here every request goes through the registry's shared client.
+    """
+
+    def __init__(self, api_key: str, http_client: httpx.AsyncClient):
+        super().__init__(api_key=api_key)
+        self.http_client = http_client
+        self._client_creator = lambda: _SharedClientContext(http_client)
+
+
+class ClientRegistry:
+    """Process-wide registry of pooled Tavily and OpenRouter clients.
+
+    Every node asks the registry for its clients, so all nodes and jobs share
+    the same keep-alive (and, when h2 is installed, HTTP/2) connection pools.
+    Pool sizes can be set through the config dict or environment variables:
+    HTTP_POOL_MAX_CONNECTIONS, HTTP_POOL_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY,
+    HTTP_POOL_WARM_CONNECTIONS and HTTP2_ENABLED.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.max_connections = config.get("max_connections", _env_int("HTTP_POOL_MAX_CONNECTIONS", 100))
+        self.max_keepalive = config.get("max_keepalive", _env_int("HTTP_POOL_MAX_KEEPALIVE", 20))
+        self.keepalive_expiry = config.get("keepalive_expiry", _env_float("HTTP_KEEPALIVE_EXPIRY", 30.0))
+        self.warm_connections = config.get("warm_connections", _env_int("HTTP_POOL_WARM_CONNECTIONS", 2))
+        http2 = config.get("http2", _env_bool("HTTP2_ENABLED", True))
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        self._tavily_client: Optional[PooledTavilyClient] = None
+        self._openai_client: Optional[AsyncOpenAI] = None
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _transport(self, provider: str) -> httpx.AsyncBaseTransport:
+        """Pooled transport for one provider: process-wide rate limits, then job tracing.
+
+        The limiter sits outside the tracing layer so HTTP spans measure the
+        request itself, not the time spent waiting for a slot.
+        """
+        return RateLimitedTransport(
+            TracingTransport(
+                httpx.AsyncHTTPTransport(limits=self._limits(), http2=self.http2),
+                provider=provider
+            ),
+            provider=provider
+        )
+
+    @property
+    def tavily(self) -> PooledTavilyClient:
+        """Shared Tavily client."""
+        if self._tavily_client is None:
+            tavily_key = os.getenv("TAVILY_API_KEY")
+            if not tavily_key:
+                raise ValueError("TAVILY_API_KEY environment variable is not set")
+            http_client = httpx.AsyncClient(
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {tavily_key}"
+                },
+                base_url=TAVILY_BASE_URL,
+                timeout=180,
+                transport=self._transport("tavily")
+            )
+            self._http_clients["tavily"] = http_client
+            self._tavily_client = PooledTavilyClient(api_key=tavily_key, http_client=http_client)
+        return self._tavily_client
+
+    @property
+    def openai(self) -> AsyncOpenAI:
+        """Shared OpenRouter (OpenAI-compatible) client."""
+        if self._openai_client is None:
+            openai_key = os.getenv("OPENAI_API_KEY")
+            if not openai_key:
+                raise ValueError("OPENAI_API_KEY environment variable is not set")
+            http_client = DefaultAsyncHttpxClient(transport=self._transport("openrouter"))
+            self._http_clients["openrouter"] = http_client
+            self._openai_client = AsyncOpenAI(
+                api_key=openai_key,
+                base_url=OPENROUTER_BASE_URL,
+                http_client=http_client
+            )
+        return self._openai_client
+
+    async def warm_up(self) -> None:
+        """Open a few keep-alive connections to each provider ahead of the first job."""
+        targets = []
+        try:
+            targets.append((self.tavily.http_client, TAVILY_BASE_URL))
+        except ValueError as e:
+            logger.warning(f"Skipping Tavily warm-up: {e}")
+        try:
+            self.openai  # creates the shared client on first access
+            targets.append((self._http_clients["openrouter"], OPENROUTER_BASE_URL))
+        except ValueError as e:
+            logger.warning(f"Skipping OpenRouter warm-up: {e}")
+
+        async def _open(client: httpx.AsyncClient, url: str) -> None:
+            try:
+                # Any response leaves an established TLS connection in the pool
+                await client.head(url, timeout=10)
+            except Exception as e:
+                logger.warning(f"Connection warm-up to {url} failed: {e}")
+
+        await asyncio.gather(*[
+            _open(client, url)
+            for client, url in targets
+            for _ in range(max(self.warm_connections, 0))
+        ])
+        logger.info(f"Warmed up {len(targets)} HTTP connection pools (http2={self.http2})")
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        for name, client in self._http_clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing {name} HTTP client: {e}")
+        self._http_clients.clear()
+        self._tavily_client = None
+        self._openai_client = None
+
+
+_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry."""
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from .checkpoints import SQLiteStore, checkpoint_store
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Document fields moved out of the graph state; the state keeps `<field>_id`
+CONTENT_FIELDS = ("content", "raw_content")
+
+
+def document_id(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+class DocumentStore(SQLiteStore):
+    """Per-job, content-addressed store for document text.
+
+    Category pipelines keep full documents only while they run; what they
+    return to the graph state carries `content_id` / `raw_content_id`
+    instead of the text, so state snapshots, streaming and checkpoints
+    stay small. Identical text (the same page found by several analysts)
+    is stored once per job.
+
+    Text is kept in memory while the job runs and, when checkpointing is
+    enabled, also written to DOCUMENT_DB (default checkpoints/documents.db)
+    so a resumed job can still read its documents.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            job_id TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (job_id, doc_id)
+        )
+        """,
+    )
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        super().__init__(
+            path or os.getenv("DOCUMENT_DB", os.path.join("checkpoints", "documents.db")),
+            checkpoint_store.enabled if enabled is None else enabled
+        )
+        # job_id -> doc_id -> text
+        self._texts: Dict[str, Dict[str, str]] = {}
+
+    async def put_documents(self, job_id: Optional[str], docs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Return copies of `docs` with their text fields replaced by document ids."""
+        if not job_id:
+            return docs
+        texts = self._texts.setdefault(job_id, {})
+        new_rows = []
+        stored = {}
+        for url, doc in docs.items():
+            doc = dict(doc)
+            for field in CONTENT_FIELDS:
+                text = doc.pop(field, None)
+                if not isinstance(text, str) or not text:
+                    continue
+                doc_id = document_id(text)
+                if doc_id not in texts:
+                    texts[doc_id] = text
+                    new_rows.append((job_id, doc_id, text))
+                doc[f"{field}_id"] = doc_id
+            stored[url] = doc
+
+        metrics.inc("documents_stored", len(new_rows))
+        if new_rows and self.enabled:
+            try:
+                await self._run_many(
+                    "INSERT OR IGNORE INTO documents (job_id, doc_id, content) VALUES (?, ?, ?)",
+                    new_rows
+                )
+            except Exception as e:
+                logger.warning(f"Failed to persist documents for job {job_id}: {e}")
+        return stored
+
+    async def get_documents(self, job_id: Optional[str], docs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Return copies of `docs` with their text fields filled back in."""
+        if not job_id:
+            return docs
+        texts = self._texts.setdefault(job_id, {})
+        missing = {
+            doc[f"{field}_id"]
+            for doc in docs.values() for field in CONTENT_FIELDS
+            if doc.get(f"{field}_id") and doc[f"{field}_id"] not in texts
+        }
+        if missing and self.enabled:
+            # Resumed in a new process: reload the job's text from disk
+            try:
+                placeholders = ",".join("?" * len(missing))
+                rows = await self._run(
+                    f"SELECT doc_id, content FROM documents WHERE job_id = ? AND doc_id IN ({placeholders})",
+                    (job_id, *missing)
+                )
+                texts.update(rows)
+            except Exception as e:
+                logger.warning(f"Failed to load documents for job {job_id}: {e}")
+
+        resolved = {}
+        for url, doc in docs.items():
+            doc = dict(doc)
+            for field in CONTENT_FIELDS:
+                if (doc_id := doc.pop(f"{field}_id", None)) and doc_id in texts:
+                    doc[field] = texts[doc_id]
+            resolved[url] = doc
+        return resolved
+
+    async def release(self, job_id: str) -> None:
+        """Drop a finished job's documents."""
+        self._texts.pop(job_id, None)
+        if not self.enabled:
+            return
+        try:
+            await self._run("DELETE FROM documents WHERE job_id = ?", (job_id,))
+        except Exception as e:
+            logger.warning(f"Failed to delete documents for job {job_id}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "jobs": len(self._texts),
+            "documents": sum(len(texts) for texts in self._texts.values()),
+            "characters": sum(len(text) for texts in self._texts.values() for text in texts.values())
+        }
+
+
+document_store = DocumentStore()
@@ -0,0 +1,142 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-process linker reused by every task a worker runs
+_worker_linker = None
+
+
+def _init_worker() -> None:
+    """Preload the CPU-bound modules once per worker process."""
+    global _worker_linker
+    from backend.utils.text_reference_linker import TextReferenceLinker
+    from backend.utils import utils  # noqa: F401  (loads reportlab)
+    logging.getLogger("backend.utils.text_reference_linker").setLevel(logging.WARNING)
+    _worker_linker = TextReferenceLinker()
+
+
+def _get_linker():
+    if _worker_linker is None:
+        _init_worker()
+    return _worker_linker
+
+
+def _noop() -> int:
+    return os.getpid()
+
+
+def link_paragraphs(linker_state: Dict[str, Any], paragraphs: List[str]) -> Tuple[List[str], str, Dict[str, Any]]:
+    """Add reference marks to report paragraphs (headings are left untouched).
+
+    Returns the processed paragraphs, the references section and the updated
+    linker state so later passes keep the same reference numbering.
+    """
+    linker = _get_linker()
+    linker.load_state(linker_state)
+    processed = []
+    for paragraph in paragraphs:
+        # 跳过标题行
+        if paragraph.startswith('#'):
+            processed.append(paragraph)
+            continue
+        # 移除任何 HTML sup 标签和重复的引用
+        paragraph = re.sub(r'<sup>\[.*?\]</sup>', '', paragraph)
+        paragraph = re.sub(r'\[\^(\d+)\].*?\[\^\1\]', r'[^\1]', paragraph)
+        paragraph = re.sub(r'\[\^(\d+)\].*?<sup>\[\1.*?\]</sup>', r'[^\1]', paragraph)
+        processed.append(linker.process_text(paragraph))
+    return processed, linker.get_references_section(), linker.export_state()
+
+
+def link_text(linker_state: Dict[str, Any], text: str) -> Tuple[str, Dict[str, Any]]:
+    """Add reference marks to a block of text."""
+    linker = _get_linker()
+    linker.load_state(linker_state)
+    return linker.process_text(text), linker.export_state()
+
+
+def select_references(curated: Dict[str, Dict[str, Dict[str, Any]]]):
+    """Run reference selection over a compact copy of the curated data."""
+    from backend.utils.references import process_references_from_search_results
+    return process_references_from_search_results(curated)
+
+
+def render_pdf(markdown_content: str) -> bytes:
+    """Render markdown to PDF bytes."""
+    from backend.utils.utils import generate_pdf_from_md
+    buffer = io.BytesIO()
+    generate_pdf_from_md(markdown_content, buffer)
+    return buffer.getvalue()
+
+
+def compact_curated_data(state: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Strip curated documents down to the fields reference selection reads."""
+    compact = {}
+    for data_type in ['curated_company_data', 'curated_industry_data', 'curated_financial_data', 'curated_news_data']:
+        compact[data_type] = {
+            url: {
+                'url': doc.get('url'),
+                'title': doc.get('title', ''),
+                'score': doc.get('score', 0),
+                'evaluation': {'overall_score': doc.get('evaluation', {}).get('overall_score', doc.get('score', 0))}
+            }
+            for url, doc in (state.get(data_type) or {}).items()
+        }
+    return compact
+
+
+class CPUExecutor:
+    """Process pool for CPU-bound stages (reference linking, PDF rendering).
+
+    Keeps regex-heavy and ReportLab work off the event loop so one uvicorn
+    process can use every core. CPU_POOL_WORKERS sets the pool size (default:
+    CPU count, 0 runs the work inline); CPU_POOL_START_METHOD picks the
+    multiprocessing start method.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("CPU_POOL_WORKERS", os.cpu_count() or 1))
+        self.max_workers = max_workers
+        self.start_method = os.getenv("CPU_POOL_START_METHOD")
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 0:
+            return None
+        if self._pool is None:
+            context = multiprocessing.get_context(self.start_method) if self.start_method else None
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker
+            )
+        return self._pool
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a module-level function in the pool and await its result."""
+        pool = self._get_pool()
+        if pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+    async def warm_up(self) -> None:
+        """Start every worker process ahead of the first job."""
+        if self._get_pool() is None:
+            return
+        pids = await asyncio.gather(*[self.run(_noop) for _ in range(self.max_workers)])
+        logger.info(f"CPU executor ready with {len(set(pids))} worker processes")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+cpu_executor = CPUExecutor()
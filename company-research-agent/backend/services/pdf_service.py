@@ -2,7 +2,7 @@ import logging
 import os
 import re
 from fastapi import HTTPException
-from backend.utils.utils import generate_pdf_from_md
+from backend.services.executor import cpu_executor, render_pdf
 from fastapi.responses import StreamingResponse
 import io
 
@@ -25,7 +25,7 @@ class PDFService:
         sanitized_name = self._sanitize_company_name(company_name)
         return f"{sanitized_name}_report.pdf"
     
-    def generate_pdf_stream(self, markdown_content, company_name=None):
+    async def generate_pdf_stream(self, markdown_content, company_name=None):
         """
         Generate a PDF from markdown content and return it as a stream.
         
@@ -48,14 +48,8 @@ class PDFService:
             # Generate the output filename
             pdf_filename = self._generate_pdf_filename(company_name)
             
-            # Create a BytesIO object to store the PDF
-            pdf_buffer = io.BytesIO()
-            
-            # Generate the PDF directly to the buffer
-            generate_pdf_from_md(markdown_content, pdf_buffer)
-            
-            # Reset buffer position to start
-            pdf_buffer.seek(0)
+            # Render in the CPU process pool so the event loop stays responsive
+            pdf_buffer = io.BytesIO(await cpu_executor.run(render_pdf, markdown_content))
             
             # Return success and the buffer
             return True, (pdf_buffer, pdf_filename)
@@ -65,7 +59,7 @@ class PDFService:
             logger.error(error_msg)
             return False, error_msg
 
-    def generate_pdf_from_job(self, job_id: str, job_status: dict, mongodb=None) -> dict:
+    async def generate_pdf_from_job(self, job_id: str, job_status: dict, mongodb=None) -> dict:
         """Generate a PDF from a job's report content."""
         try:
             # First try to get report from memory
@@ -99,7 +93,7 @@ class PDFService:
                 except Exception as e:
                     logger.warning(f"Failed to get company name from MongoDB: {e}")
 
-            success, result = self.generate_pdf_stream(report_content, company_name)
+            success, result = await self.generate_pdf_stream(report_content, company_name)
             if success:
                 pdf_buffer, filename = result
                 return StreamingResponse(
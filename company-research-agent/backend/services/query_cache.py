@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from .checkpoints import SQLiteStore
+from .metrics import metrics
+from .snapshots import company_key
+
+logger = logging.getLogger(__name__)
+
+# Entries older than this are purged whatever the granularity
+MAX_AGE_SECONDS = 8 * 24 * 3600
+
+
+def date_bucket(granularity: str, today: Optional[date] = None) -> str:
+    today = today or date.today()
+    if granularity == "week":
+        year, week, _ = today.isocalendar()
+        return f"{year}-W{week:02d}"
+    return today.isoformat()
+
+
+class QueryCache(SQLiteStore):
+    """Generated search queries, reused by repeated research of the same company.
+
+    Query generation runs at temperature 0, so the same company, industry,
+    location, analyst prompt and query count give the same queries within
+    a date bucket. QUERY_CACHE_GRANULARITY picks the bucket (day or week,
+    default day); QUERY_CACHE_DB sets the database path (default
+    checkpoints/query_cache.db) and QUERY_CACHE_ENABLED=false turns it off.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS query_cache (
+            key TEXT PRIMARY KEY,
+            queries TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+    )
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("QUERY_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+        super().__init__(
+            path or os.getenv("QUERY_CACHE_DB", os.path.join("checkpoints", "query_cache.db")),
+            enabled
+        )
+        self.granularity = os.getenv("QUERY_CACHE_GRANULARITY", "day").lower()
+
+    def _key(self, state: Dict[str, Any], analyst_type: str, prompt: str, count: int) -> str:
+        parts = [
+            company_key(state.get("company")),
+            company_key(state.get("industry")),
+            company_key(state.get("hq_location")),
+            analyst_type,
+            " ".join(prompt.split()),
+            count,
+            date_bucket(self.granularity)
+        ]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    async def get(self, state: Dict[str, Any], analyst_type: str, prompt: str, count: int) -> Optional[List[str]]:
+        if not self.enabled:
+            return None
+        try:
+            rows = await self._run(
+                "SELECT queries FROM query_cache WHERE key = ?",
+                (self._key(state, analyst_type, prompt, count),)
+            )
+        except Exception as e:
+            logger.warning(f"Query cache lookup failed: {e}")
+            return None
+        if rows:
+            metrics.inc("query_cache_hits", analyst=analyst_type)
+            return json.loads(rows[0][0])
+        metrics.inc("query_cache_misses", analyst=analyst_type)
+        return None
+
+    async def put(self, state: Dict[str, Any], analyst_type: str, prompt: str, count: int,
+                  queries: List[str]) -> None:
+        if not self.enabled or not queries:
+            return
+        try:
+            now = time.time()
+            await self._run(
+                "INSERT OR REPLACE INTO query_cache (key, queries, created_at) VALUES (?, ?, ?)",
+                (self._key(state, analyst_type, prompt, count), json.dumps(queries), now)
+            )
+            await self._run("DELETE FROM query_cache WHERE created_at < ?", (now - MAX_AGE_SECONDS,))
+        except Exception as e:
+            logger.warning(f"Failed to cache queries for {analyst_type}: {e}")
+
+
+query_cache = QueryCache()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset(
+    "a an and are as at by for from in into is of on or the to with about its their latest recent main key top".split()
+)
+SUFFIXES = ("ings", "ing", "ies", "es", "ed", "s")
+
+
+def _stem(token: str) -> str:
+    for suffix in SUFFIXES:
+        if len(token) - len(suffix) >= 4 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def query_tokens(query: str, ignore: FrozenSet[str] = frozenset()) -> FrozenSet[str]:
+    """Normalized token set: lowercased, stemmed, without stopwords, years and `ignore` tokens."""
+    tokens = re.findall(r"[a-z0-9]+", query.lower())
+    return frozenset(
+        _stem(token) for token in tokens
+        if token not in STOPWORDS and token not in ignore and not re.fullmatch(r"(19|20)\d\d", token)
+    )
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class JobQueries:
+    """Searches dispatched by the analysts of one job.
+
+    A query whose token set is at least `threshold` similar (Jaccard) to
+    one already searched in the job with the same parameters (topic,
+    depth, max_results, ...) reuses that search's results instead of
+    running its own. The company name is ignored, since every query has it.
+    """
+
+    def __init__(self, job_id: str, company: str, threshold: float):
+        self.job_id = job_id
+        self.threshold = threshold
+        self.ignore = query_tokens(company or "")
+        # search parameters -> (tokens, query, result future) of every search run so far
+        self._searches: Dict[str, List[Tuple[FrozenSet[str], str, asyncio.Future]]] = {}
+        self.stats = {"searches": 0, "suppressed": 0}
+
+    def _similar(self, tokens: FrozenSet[str], searches) -> Optional[Tuple[str, asyncio.Future]]:
+        best = max(searches, key=lambda search: jaccard(tokens, search[0]), default=None)
+        if best is not None and jaccard(tokens, best[0]) >= self.threshold:
+            return best[1], best[2]
+        return None
+
+    async def search(self, query: str, params: Dict[str, Any], factory: Callable[[], Awaitable[Any]]) -> Any:
+        tokens = query_tokens(query, self.ignore)
+        searches = self._searches.setdefault(json.dumps(params, sort_keys=True), [])
+        if (similar := self._similar(tokens, searches)) is not None:
+            original, future = similar
+            try:
+                result = await asyncio.shield(future)
+            except Exception:
+                result = None
+            if result:
+                self.stats["suppressed"] += 1
+                metrics.inc("searches_suppressed")
+                logger.info(f"Query '{query}' is a near-duplicate of '{original}', sharing its results")
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        searches.append((tokens, query, future))
+        self.stats["searches"] += 1
+        try:
+            result = await factory()
+        except BaseException as e:
+            searches[:] = [search for search in searches if search[2] is not future]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        future.set_result(result)
+        return result
+
+
+class QueryDeduplicator:
+    """Per-job near-duplicate search suppression.
+
+    QUERY_DEDUP_THRESHOLD sets the token-set similarity at which two
+    queries count as duplicates (default 0.6; 1 merges only identical
+    token sets, 0 turns the filter off).
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        if threshold is None:
+            threshold = float(os.getenv("QUERY_DEDUP_THRESHOLD", 0.6))
+        self.threshold = threshold
+        self._jobs: Dict[str, JobQueries] = {}
+
+    def for_job(self, job_id: Optional[str], company: str = "") -> Optional[JobQueries]:
+        if not job_id or self.threshold <= 0:
+            return None
+        if job_id not in self._jobs:
+            self._jobs[job_id] = JobQueries(job_id, company, self.threshold)
+        return self._jobs[job_id]
+
+    def release(self, job_id: str) -> Optional[Dict[str, int]]:
+        """Forget a finished job; returns its search and suppression counts."""
+        if (job_queries := self._jobs.pop(job_id, None)) is None:
+            return None
+        if job_queries.stats["suppressed"]:
+            logger.info(f"Job {job_id}: {job_queries.stats['suppressed']} near-duplicate searches suppressed, "
+                        f"{job_queries.stats['searches']} run")
+        return dict(job_queries.stats)
+
+
+query_dedup = QueryDeduplicator()
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (provider, endpoint) -> (requests per second, burst, max concurrent requests)
+DEFAULT_LIMITS: Dict[Tuple[str, str], Tuple[float, int, int]] = {
+    ("tavily", "search"): (10.0, 20, 20),
+    ("tavily", "extract"): (10.0, 20, 60),
+    ("openrouter", "chat"): (5.0, 10, 16),
+}
+
+# Latency spike threshold as a multiple of the baseline; LLM latency varies
+# with the output length, so chat completions get a wider margin
+SPIKE_FACTORS = {"chat": 5.0}
+
+# Request path suffix -> endpoint name
+ENDPOINTS = {
+    "/search": "search",
+    "/extract": "extract",
+    "/chat/completions": "chat",
+}
+
+
+def endpoint_for(path: str) -> Optional[str]:
+    for suffix, endpoint in ENDPOINTS.items():
+        if path.endswith(suffix):
+            return endpoint
+    return None
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        # One waiter at a time keeps the queue first come, first served
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for a while (e.g. after a 429)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class AIMDController:
+    """Concurrency limit adjusted by additive increase / multiplicative decrease.
+
+    Every healthy response grows the limit by 1/limit (about +1 per round of
+    requests) up to `maximum`. A 429, a 5xx, a transport error or a latency
+    spike (latency above `spike_factor` times the running baseline) cuts the
+    limit by `decrease`, at most once per `cooldown` seconds, down to
+    `minimum`. With adaptive=False the limit stays at `maximum`.
+    """
+
+    def __init__(self, name: str, maximum: int, minimum: int = 1, adaptive: bool = True,
+                 decrease: float = 0.5, spike_factor: float = 3.0, cooldown: float = 2.0):
+        self.name = name
+        self.maximum = max(maximum, 1)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.adaptive = adaptive
+        # Start halfway and probe upwards while the provider keeps up
+        self.limit = float(max(self.minimum, self.maximum // 2) if adaptive else self.maximum)
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.cooldown = cooldown
+        self.baseline: Optional[float] = None  # EWMA latency of healthy responses
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._publish()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def record(self, latency: float, status_code: Optional[int]) -> None:
+        """Feed back one request's latency and status (None for transport errors)."""
+        if not self.adaptive:
+            return
+        overloaded = status_code is None or status_code == 429 or status_code >= 500
+        spiked = (not overloaded and self.baseline is not None and self.spike_factor > 0
+                  and latency > self.baseline * self.spike_factor)
+        if overloaded or spiked:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                previous = self.limit
+                self.limit = max(float(self.minimum), self.limit * self.decrease)
+                metrics.inc("concurrency_decreases", endpoint=self.name,
+                            reason="latency" if spiked else "error")
+                logger.info(f"{self.name} concurrency {previous:.1f} -> {self.limit:.1f} "
+                            f"({'latency spike' if spiked else f'status {status_code}'})")
+        else:
+            self.baseline = latency if self.baseline is None else 0.9 * self.baseline + 0.1 * latency
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._wake()
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("concurrency_limit", int(self.limit), endpoint=self.name)
+
+
+class EndpointLimiter:
+    """Request rate and (adaptive) concurrency limit for one provider endpoint."""
+
+    def __init__(self, name: str, rate: float, burst: int, controller: Optional[AIMDController]):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.controller = controller
+
+    @property
+    def in_flight(self) -> int:
+        return self.controller.in_flight if self.controller else 0
+
+    async def acquire(self) -> float:
+        """Wait for a concurrency slot and a token; returns the time spent waiting."""
+        start = time.monotonic()
+        if self.controller:
+            await self.controller.acquire()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.release()
+            raise
+        return time.monotonic() - start
+
+    def record(self, latency: float, status_code: Optional[int]) -> None:
+        if self.controller:
+            self.controller.record(latency, status_code)
+
+    def release(self) -> None:
+        if self.controller:
+            self.controller.release()
+
+
+class RateLimiterRegistry:
+    """Process-wide limiters shared by every job and call site.
+
+    Each provider endpoint gets its own token bucket and concurrency cap,
+    configurable with RATE_LIMIT_<PROVIDER>_<ENDPOINT>_RPS, _BURST,
+    _CONCURRENCY (the ceiling) and _MIN_CONCURRENCY (e.g.
+    RATE_LIMIT_TAVILY_EXTRACT_RPS=5). A rate or concurrency of 0 disables
+    that limit. Between floor and ceiling the concurrency limit adapts to
+    the provider's latency and errors unless ADAPTIVE_CONCURRENCY=false.
+    """
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], EndpointLimiter] = {}
+
+    def get(self, provider: str, endpoint: str) -> EndpointLimiter:
+        key = (provider, endpoint)
+        if key not in self._limiters:
+            rate, burst, concurrency = DEFAULT_LIMITS.get(key, (0.0, 1, 0))
+            prefix = f"RATE_LIMIT_{provider.upper()}_{endpoint.upper()}"
+            rate = float(os.getenv(f"{prefix}_RPS", rate))
+            burst = int(os.getenv(f"{prefix}_BURST", burst))
+            concurrency = int(os.getenv(f"{prefix}_CONCURRENCY", concurrency))
+            name = f"{provider}.{endpoint}"
+            controller = None
+            if concurrency > 0:
+                controller = AIMDController(
+                    name,
+                    maximum=concurrency,
+                    minimum=int(os.getenv(f"{prefix}_MIN_CONCURRENCY", 1)),
+                    adaptive=os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() not in ("0", "false", "no"),
+                    spike_factor=SPIKE_FACTORS.get(endpoint, 3.0)
+                )
+            self._limiters[key] = EndpointLimiter(name, rate, burst, controller)
+            logger.info(f"Rate limit for {provider} {endpoint}: {rate} req/s (burst {burst}), "
+                        f"concurrency {concurrency or 'unlimited'}")
+        return self._limiters[key]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for limiter in self._limiters.values():
+            controller = limiter.controller
+            stats[limiter.name] = {
+                "rate": limiter.bucket.rate,
+                "concurrency_limit": int(controller.limit) if controller else None,
+                "concurrency_max": controller.maximum if controller else None,
+                "latency_baseline_ms": round(controller.baseline * 1000, 1)
+                if controller and controller.baseline is not None else None,
+                "in_flight": limiter.in_flight
+            }
+        return stats
+
+
+rate_limiters = RateLimiterRegistry()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Holds the limiter slot until the response body has been consumed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, limiter: EndpointLimiter):
+        self._stream = stream
+        self._limiter = limiter
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._limiter.release()
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that passes every provider request through its endpoint limiter."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, provider: str,
+                 registry: Optional[RateLimiterRegistry] = None):
+        self._transport = transport
+        self.provider = provider
+        self.registry = registry or rate_limiters
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = endpoint_for(request.url.path)
+        if endpoint is None:
+            return await self._transport.handle_async_request(request)
+
+        limiter = self.registry.get(self.provider, endpoint)
+        waited = await limiter.acquire()
+        metrics.observe("ratelimit_wait_seconds", waited, provider=self.provider, endpoint=endpoint)
+        start = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except asyncio.CancelledError:
+            limiter.release()
+            raise
+        except BaseException:
+            limiter.record(time.monotonic() - start, None)
+            limiter.release()
+            raise
+        # Time to response headers, i.e. the provider's queueing plus processing time
+        limiter.record(time.monotonic() - start, response.status_code)
+
+        if response.status_code == 429:
+            retry_after = response.headers.get("retry-after")
+            try:
+                pause = float(retry_after) if retry_after else 1.0
+            except ValueError:
+                pause = 1.0
+            limiter.bucket.pause(pause)
+            metrics.inc("ratelimit_429", provider=self.provider, endpoint=endpoint)
+            logger.warning(f"{self.provider} {endpoint} returned 429, pausing for {pause:.1f}s")
+
+        try:
+            # Already buffered (e.g. in-memory transports): nothing left to stream
+            response.content
+        except httpx.ResponseNotRead:
+            response.stream = _ReleasingStream(response.stream, limiter)
+        else:
+            limiter.release()
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
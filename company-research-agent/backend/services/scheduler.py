@@ -0,0 +1,190 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedJob:
+    """A research job waiting for (or running on) a scheduler worker."""
+
+    def __init__(self, job_id: str, factory: Callable[[], Awaitable[Any]], priority: int, seq: int):
+        self.job_id = job_id
+        self.factory = factory
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+
+    @property
+    def sort_key(self):
+        # Higher priority first, then first come first served
+        return (-self.priority, self.seq)
+
+
+class JobScheduler:
+    """Bounded worker pool with a priority queue for research jobs.
+
+    At most `worker_count` jobs (RESEARCH_WORKERS, default 4) run at once;
+    the rest wait in priority order and are told their queue position over
+    the WebSocket whenever it changes (only jobs whose position moved are
+    sent an update, so queuing a batch stays linear in its size).
+    """
+
+    def __init__(self, websocket_manager=None, worker_count: Optional[int] = None):
+        self.websocket_manager = websocket_manager
+        self.worker_count = worker_count or int(os.getenv("RESEARCH_WORKERS", 4))
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pending: Dict[str, QueuedJob] = {}
+        self._running: Dict[str, QueuedJob] = {}
+        # job_id -> queue position last sent to the job's clients
+        self._sent_positions: Dict[str, int] = {}
+        self._workers = []
+        self._seq = itertools.count()
+
+    def start(self) -> None:
+        """Start the worker tasks (idempotent)."""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"research-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Job scheduler started with {self.worker_count} workers")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, job_id: str, factory: Callable[[], Awaitable[Any]], priority: int = 0) -> int:
+        """Queue a job; `factory` creates the coroutine once a worker picks it up.
+
+        Returns the job's 1-based queue position.
+        """
+        self.start()
+        job = QueuedJob(job_id, factory, priority, next(self._seq))
+        self._pending[job_id] = job
+        await self._queue.put((job.sort_key, job_id))
+        self._update_gauges()
+        await self._broadcast_positions()
+        return self.position(job_id) or 0
+
+    async def cancel(self, job_id: str, timeout: float = 10.0) -> Optional[str]:
+        """Cancel a queued or running job.
+
+        A running job's task is cancelled, which cancels every node, gather
+        and in-flight HTTP request beneath it; this waits (up to `timeout`)
+        for the task to unwind so its connections are released. Returns
+        "queued" or "running" for the state the job was cancelled in, or None
+        if the scheduler does not know the job or it has already finished.
+        """
+        if job := self._pending.pop(job_id, None):
+            # The queue entry stays behind; the worker skips it
+            job.cancelled = True
+            self._update_gauges()
+            metrics.inc("scheduler_jobs_cancelled", state="queued")
+            await self._broadcast_positions()
+            return "queued"
+
+        job = self._running.get(job_id)
+        if job is None or (job.task is not None and job.task.done()):
+            return None
+        job.cancelled = True
+        if job.task is not None:
+            job.task.cancel()
+            await asyncio.wait({job.task}, timeout=timeout)
+        metrics.inc("scheduler_jobs_cancelled", state="running")
+        return "running"
+
+    def cancel_requested(self, job_id: str) -> bool:
+        """Whether a running job is being cancelled through cancel()."""
+        job = self._running.get(job_id)
+        return job is not None and job.cancelled
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based queue position of a pending job, or None if it is not queued."""
+        job = self._pending.get(job_id)
+        if job is None:
+            return None
+        return 1 + sum(1 for other in self._pending.values() if other.sort_key < job.sort_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.worker_count,
+            "queue_depth": len(self._pending),
+            "running": len(self._running)
+        }
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("scheduler_queue_depth", len(self._pending))
+        metrics.set_gauge("scheduler_running_jobs", len(self._running))
+
+    async def _broadcast_positions(self) -> None:
+        """Send the queue position to every waiting job whose position changed."""
+        ordered = sorted(self._pending.values(), key=lambda job: job.sort_key)
+        positions = {job.job_id: position for position, job in enumerate(ordered, start=1)}
+        self._sent_positions = {
+            job_id: position for job_id, position in self._sent_positions.items() if job_id in positions
+        }
+        if not self.websocket_manager:
+            return
+        for job_id, position in positions.items():
+            if self._sent_positions.get(job_id) == position:
+                continue
+            self._sent_positions[job_id] = position
+            try:
+                await self.websocket_manager.send_status_update(
+                    job_id=job_id,
+                    status="queued",
+                    message=f"Waiting in queue (position {position})",
+                    result={
+                        "step": "Queued",
+                        "queue_position": position,
+                        "queue_depth": len(self._pending)
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"Failed to send queue position for job {job_id}: {e}")
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            _, job_id = await self._queue.get()
+            job = self._pending.pop(job_id, None)
+            if job is None:
+                # Removed from the queue before a worker reached it
+                self._queue.task_done()
+                continue
+
+            wait_time = time.monotonic() - job.enqueued_at
+            metrics.observe("scheduler_wait_seconds", wait_time)
+            logger.info(f"Worker {worker_id} starting job {job_id} after {wait_time:.2f}s in queue")
+
+            self._running[job_id] = job
+            # Each job runs in its own task so it can be cancelled without stopping the worker.
+            # Create it before the next await so a cancel() arriving meanwhile has a task to cancel.
+            job.task = asyncio.create_task(job.factory(), name=f"research-job-{job_id}")
+            self._update_gauges()
+            try:
+                await self._broadcast_positions()
+                await job.task
+            except asyncio.CancelledError:
+                if not job.cancelled:
+                    job.task.cancel()
+                    raise  # the worker itself is being stopped
+                logger.info(f"Job {job_id} cancelled in worker {worker_id}")
+            except Exception as e:
+                logger.error(f"Job {job_id} failed in worker {worker_id}: {e}", exc_info=True)
+            finally:
+                self._running.pop(job_id, None)
+                self._update_gauges()
+                metrics.inc("scheduler_jobs_completed")
+                self._queue.task_done()
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .batch import search_key
+from .checkpoints import SQLiteStore
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Default freshness per Tavily search topic, in hours
+DEFAULT_TOPIC_TTL_HOURS = {
+    "news": 6,
+    "finance": 24,
+    "general": 24 * 7
+}
+
+
+class SearchCache(SQLiteStore):
+    """Disk-backed TTL cache for Tavily search responses.
+
+    Entries are keyed on the normalized query plus the search parameters
+    (topic, depth, max_results, ...), so identical searches from repeated
+    research of the same company are answered locally. Each topic has its
+    own TTL (SEARCH_CACHE_TTL_<TOPIC>_HOURS, e.g. SEARCH_CACHE_TTL_NEWS_HOURS);
+    when the cache grows beyond SEARCH_CACHE_MAX_MB the least recently used
+    entries are evicted.
+
+    SEARCH_CACHE_DB sets the database path (default
+    checkpoints/search_cache.db); SEARCH_CACHE_ENABLED=false turns it off.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS search_cache (
+            key TEXT PRIMARY KEY,
+            topic TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS search_cache_last_used ON search_cache (last_used)",
+    )
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+        super().__init__(
+            path or os.getenv("SEARCH_CACHE_DB", os.path.join("checkpoints", "search_cache.db")),
+            enabled
+        )
+        self.ttls = {
+            topic: float(os.getenv(f"SEARCH_CACHE_TTL_{topic.upper()}_HOURS", hours)) * 3600
+            for topic, hours in DEFAULT_TOPIC_TTL_HOURS.items()
+        }
+        self.max_bytes = int(float(os.getenv("SEARCH_CACHE_MAX_MB", 200)) * 1024 * 1024)
+
+    @staticmethod
+    def _key(query: str, params: Dict[str, Any]) -> str:
+        return hashlib.sha256(search_key(query, params).encode("utf-8")).hexdigest()
+
+    async def get(self, query: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        topic = params.get("topic", "general")
+        key = self._key(query, params)
+        rows = await self._run("SELECT payload, created_at FROM search_cache WHERE key = ?", (key,))
+        if rows and time.time() - rows[0][1] <= self.ttls.get(topic, self.ttls["general"]):
+            metrics.inc("search_cache_hits", topic=topic)
+            await self._run("UPDATE search_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(rows[0][0])
+        metrics.inc("search_cache_misses", topic=topic)
+        if rows:
+            await self._run("DELETE FROM search_cache WHERE key = ?", (key,))
+        return None
+
+    async def put(self, query: str, params: Dict[str, Any], result: Dict[str, Any]) -> None:
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        now = time.time()
+        await self._run(
+            "INSERT OR REPLACE INTO search_cache (key, topic, payload, size, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self._key(query, params), params.get("topic", "general"), payload, len(payload), now, now)
+        )
+        await self._evict()
+
+    async def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = (await self._run("SELECT COALESCE(SUM(size), 0) FROM search_cache"))[0][0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            evicted = []
+            for key, size in await self._run("SELECT key, size FROM search_cache ORDER BY last_used"):
+                if excess <= 0:
+                    break
+                evicted.append((key,))
+                excess -= size
+            await self._run_many("DELETE FROM search_cache WHERE key = ?", evicted)
+            metrics.inc("search_cache_evictions", len(evicted))
+            total = excess + self.max_bytes
+        metrics.set_gauge("search_cache_bytes", total)
+
+    async def search(self, query: str, params: Dict[str, Any],
+                     factory: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return a cached response for (query, params), or call `factory` and cache its result."""
+        if not self.enabled:
+            return await factory()
+        try:
+            if (cached := await self.get(query, params)) is not None:
+                return cached
+        except Exception as e:
+            logger.warning(f"Search cache lookup failed: {e}")
+
+        result = await factory()
+        if result and result.get("results"):
+            try:
+                await self.put(query, params, result)
+            except Exception as e:
+                logger.warning(f"Failed to cache search results: {e}")
+        return result
+
+
+search_cache = SearchCache()
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from .metrics import metrics
+from .search_strategy import RELEVANCE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+class QueryYield:
+    """New, relevant URLs contributed by each query of one run.
+
+    The first `min_queries` queries are probes: later queries wait until
+    they have finished. From then on, a query adding fewer than
+    `min_new_urls` URLs that are above the relevance threshold and not
+    already found stops the run from issuing further queries.
+    """
+
+    def __init__(self, name: str, min_new_urls: int, min_queries: int = 2):
+        self.name = name
+        self.min_new_urls = min_new_urls
+        self.min_queries = min_queries
+        self.seen: Set[str] = set()
+        self.completed = 0
+        self.stopped = False
+        self.probed = asyncio.Event()
+
+    def finished(self) -> None:
+        """Count a finished query, successful or not."""
+        self.completed += 1
+        if self.completed >= self.min_queries:
+            self.probed.set()
+
+    def add(self, query: str, documents: Dict[str, Any]) -> int:
+        relevant = set()
+        for url, doc in documents.items():
+            try:
+                if float(doc.get("score", 0)) >= RELEVANCE_THRESHOLD:
+                    relevant.add(url)
+            except (TypeError, ValueError):
+                continue
+        new = len(relevant - self.seen)
+        self.seen |= relevant
+        metrics.observe("search_query_yield", new, analyst=self.name)
+        logger.info(f"{self.name} query '{query}': {new} new relevant URLs "
+                    f"({len(relevant)} relevant, {len(documents)} results)")
+        if self.completed >= self.min_queries and new < self.min_new_urls and not self.stopped:
+            logger.info(f"{self.name}: marginal yield below {self.min_new_urls}, issuing no further queries")
+            self.stopped = True
+        return new
+
+
+class SearchExecutor:
+    """Runs an analyst's search queries concurrently.
+
+    At most `max_concurrency` queries of one call are in flight at a time
+    (SEARCH_CONCURRENCY, default 4); process-wide limits still come from the
+    Tavily rate limiter. Results stay attributed to the query that found
+    them, and a failed query yields no documents instead of failing the
+    others.
+
+    The first two queries run as a probe wave; the remaining ones start
+    once both have finished, at full concurrency. Once a query adds fewer
+    than SEARCH_MIN_NEW_URLS (default 2) new relevant URLs, queries that
+    have not started yet are skipped and no further queries are taken from
+    the stream; searches already in flight finish. This holds however the
+    queries arrive (planned, cached or streamed). SEARCH_MIN_NEW_URLS=0
+    turns it off and runs every query as soon as it arrives.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, min_new_urls: Optional[int] = None):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("SEARCH_CONCURRENCY", 4))
+        if min_new_urls is None:
+            min_new_urls = int(os.getenv("SEARCH_MIN_NEW_URLS", 2))
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_new_urls = max(min_new_urls, 0)
+
+    async def _search(self, semaphore: asyncio.Semaphore, query: str,
+                      search: Callable[[str], Awaitable[Dict[str, Any]]],
+                      query_yield: Optional[QueryYield] = None, probe: bool = True) -> Dict[str, Any]:
+        if query_yield and not probe:
+            await query_yield.probed.wait()
+        async with semaphore:
+            if query_yield and query_yield.stopped:
+                logger.info(f"Skipping {query_yield.name} query '{query}': earlier queries stopped finding new URLs")
+                metrics.inc("searches_skipped_low_yield", analyst=query_yield.name)
+                return {}
+            try:
+                result = await search(query) or {}
+            except Exception as e:
+                logger.error(f"Search failed for query '{query}': {e}")
+                metrics.inc("search_query_failures")
+                result = None
+            if query_yield:
+                # Counted first: this query's yield decides whether the waiting queries run
+                query_yield.finished()
+                if result is not None:
+                    query_yield.add(query, result)
+            return result or {}
+
+    async def run_stream(self, queries: AsyncIterator[str], search: Callable[[str], Awaitable[Dict[str, Any]]],
+                         name: str = "search") -> Dict[str, Dict[str, Any]]:
+        """Start each query's search as soon as the query arrives; returns {query: documents}."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        query_yield = QueryYield(name, self.min_new_urls) if self.min_new_urls else None
+        tasks: Dict[str, asyncio.Task] = {}
+        try:
+            async for query in queries:
+                if query_yield and query_yield.stopped:
+                    # Stop the query generation as well; it keeps what it has generated so far
+                    if aclose := getattr(queries, "aclose", None):
+                        await aclose()
+                    break
+                if query not in tasks:
+                    probe = query_yield is None or len(tasks) < query_yield.min_queries
+                    tasks[query] = asyncio.create_task(self._search(semaphore, query, search, query_yield, probe))
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(tasks, results))
+
+
+search_executor = SearchExecutor()
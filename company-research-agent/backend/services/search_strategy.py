@@ -0,0 +1,114 @@
+import logging
+import math
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tavily score a document needs for the curator to keep it
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", 0.4))
+
+# Result counts move in steps so the search cache keys stay stable
+RESULT_STEP = 5
+
+
+class SearchStrategy:
+    """Picks the Tavily search depth and result count of each query.
+
+    SEARCH_DEPTH_MODE=tiered (default) runs a basic search first and
+    escalates to advanced only when fewer than SEARCH_MIN_RELEVANT
+    (default 3) results clear the curator's relevance threshold;
+    SEARCH_DEPTH_MODE=advanced always searches advanced.
+
+    max_results is tuned per analyst from the share of its past results
+    that cleared the threshold (an exponential moving average), aiming at
+    SEARCH_TARGET_KEPT (default 5) kept documents per query, between
+    SEARCH_MIN_RESULTS and SEARCH_MAX_RESULTS (default 5 and 20). Until an
+    analyst has a keep rate it gets SEARCH_DEFAULT_RESULTS (default 10).
+    """
+
+    def __init__(self, mode: Optional[str] = None):
+        self.mode = (mode or os.getenv("SEARCH_DEPTH_MODE", "tiered")).lower()
+        self.relevance_threshold = RELEVANCE_THRESHOLD
+        self.min_relevant = int(os.getenv("SEARCH_MIN_RELEVANT", 3))
+        self.target_kept = float(os.getenv("SEARCH_TARGET_KEPT", 5))
+        self.min_results = int(os.getenv("SEARCH_MIN_RESULTS", 5))
+        self.max_results_limit = int(os.getenv("SEARCH_MAX_RESULTS", 20))
+        self.default_results = int(os.getenv("SEARCH_DEFAULT_RESULTS", 10))
+        self.alpha = 0.3
+        # analyst_type -> moving average of the share of results kept
+        self.keep_rates: Dict[str, float] = {}
+
+    def max_results(self, analyst_type: str) -> int:
+        keep_rate = self.keep_rates.get(analyst_type)
+        if keep_rate is None:
+            return self.default_results
+        wanted = self.target_kept / max(keep_rate, 0.05)
+        stepped = math.ceil(wanted / RESULT_STEP) * RESULT_STEP
+        return max(self.min_results, min(self.max_results_limit, stepped))
+
+    def relevant(self, result: Optional[Dict[str, Any]]) -> int:
+        """Number of results the curator would keep."""
+        count = 0
+        for doc in (result or {}).get("results") or []:
+            try:
+                if float(doc.get("score", 0)) >= self.relevance_threshold:
+                    count += 1
+            except (TypeError, ValueError):
+                continue
+        return count
+
+    def record(self, analyst_type: str, result: Optional[Dict[str, Any]]) -> None:
+        results = (result or {}).get("results") or []
+        if not results:
+            return
+        keep_rate = self.relevant(result) / len(results)
+        previous = self.keep_rates.get(analyst_type)
+        self.keep_rates[analyst_type] = keep_rate if previous is None else (
+            self.alpha * keep_rate + (1 - self.alpha) * previous
+        )
+        metrics.set_gauge("search_keep_rate", round(self.keep_rates[analyst_type], 3), analyst=analyst_type)
+
+    async def search(self, analyst_type: str, query: str, params: Dict[str, Any],
+                     run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Search `query` through `run(params)` at the cheapest sufficient depth."""
+        params = {**params, "max_results": self.max_results(analyst_type)}
+        if self.mode != "tiered":
+            result = await run({**params, "search_depth": "advanced"})
+            self.record(analyst_type, result)
+            return result
+
+        basic = None
+        try:
+            basic = await run({**params, "search_depth": "basic"})
+        except Exception as e:
+            logger.warning(f"Basic search failed for '{query}', escalating: {e}")
+        if self.relevant(basic) >= self.min_relevant:
+            metrics.inc("search_depth", depth="basic", analyst=analyst_type)
+            self.record(analyst_type, basic)
+            return basic
+
+        metrics.inc("search_depth", depth="advanced", analyst=analyst_type)
+        logger.info(f"Escalating '{query}' to advanced search ({self.relevant(basic)} relevant basic results)")
+        try:
+            result = await run({**params, "search_depth": "advanced"})
+        except Exception:
+            if basic and basic.get("results"):
+                return basic
+            raise
+        if self.relevant(basic) > self.relevant(result):
+            result = basic
+        self.record(analyst_type, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_results": {analyst: self.max_results(analyst) for analyst in self.keep_rates},
+            "keep_rates": {analyst: round(rate, 3) for analyst, rate in self.keep_rates.items()}
+        }
+
+
+search_strategy = SearchStrategy()
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from .checkpoints import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Default freshness per research category, in hours
+DEFAULT_CATEGORY_TTL_HOURS = {
+    "news": 24,
+    "financial": 24 * 7,
+    "industry": 24 * 14,
+    "company": 24 * 30
+}
+
+
+def company_key(company: str) -> str:
+    return " ".join((company or "").lower().split())
+
+
+class SnapshotStore(SQLiteStore):
+    """Latest research output per company, used by refresh runs.
+
+    Each category pipeline stores its raw data, curated data and briefing;
+    the editor stores the finished report together with its reference
+    numbering. A refresh run reuses every category whose snapshot is younger
+    than its TTL (REFRESH_TTL_<CATEGORY>_HOURS, e.g. REFRESH_TTL_NEWS_HOURS)
+    and only rewrites the report sections of the categories it re-ran.
+
+    SNAPSHOT_DB sets the database path (default checkpoints/snapshots.db).
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            company TEXT NOT NULL,
+            name TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (company, name)
+        )
+        """,
+    )
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path or os.getenv("SNAPSHOT_DB", os.path.join("checkpoints", "snapshots.db")))
+        self.ttls = {
+            category: float(os.getenv(f"REFRESH_TTL_{category.upper()}_HOURS", hours)) * 3600
+            for category, hours in DEFAULT_CATEGORY_TTL_HOURS.items()
+        }
+
+    async def save(self, company: str, name: str, payload: Dict[str, Any]) -> None:
+        await self._run(
+            "INSERT OR REPLACE INTO snapshots (company, name, payload, updated_at) VALUES (?, ?, ?, ?)",
+            (company_key(company), name, json.dumps(payload, ensure_ascii=False, default=str), time.time())
+        )
+
+    async def load(self, company: str, name: str) -> Optional[Dict[str, Any]]:
+        """Return the snapshot payload with its age in seconds under `age`."""
+        rows = await self._run(
+            "SELECT payload, updated_at FROM snapshots WHERE company = ? AND name = ?",
+            (company_key(company), name)
+        )
+        if not rows:
+            return None
+        payload, updated_at = rows[0]
+        return {**json.loads(payload), "age": time.time() - updated_at}
+
+    async def load_fresh_category(self, company: str, category: str) -> Optional[Dict[str, Any]]:
+        """Return a category snapshot if it is still within its TTL."""
+        snapshot = await self.load(company, category)
+        if snapshot is None:
+            return None
+        ttl = self.ttls.get(category, 0)
+        if snapshot["age"] > ttl:
+            logger.info(f"{category} snapshot for {company} expired "
+                        f"({snapshot['age'] / 3600:.1f}h old, TTL {ttl / 3600:.0f}h)")
+            return None
+        return snapshot
+
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,313 @@
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Trace of the job whose code is currently running (inherited by child tasks)
+_current_trace: ContextVar[Optional["JobTrace"]] = ContextVar("current_trace", default=None)
+
+
+class Span:
+    """A single timed operation inside a job trace."""
+
+    def __init__(self, trace: "JobTrace", name: str, category: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.lane = trace.lane_for_current_task()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def finish(self, **attrs) -> None:
+        if self.end is not None:
+            return
+        self.attrs.update(attrs)
+        self.end = time.perf_counter()
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.finish()
+        return False
+
+
+class JobTrace:
+    """Collects the spans recorded for one research job."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lanes: Dict[int, int] = {}
+
+    def lane_for_current_task(self) -> int:
+        """Map the running asyncio task to a small, stable lane (thread) id."""
+        try:
+            task_key = id(asyncio.current_task())
+        except RuntimeError:
+            task_key = 0
+        if task_key not in self._lanes:
+            self._lanes[task_key] = len(self._lanes) + 1
+        return self._lanes[task_key]
+
+    def span(self, name: str, category: str = "step", **attrs) -> Span:
+        """Start a span; use it as a context manager or call finish()."""
+        span = Span(self, name, category, attrs)
+        self.spans.append(span)
+        return span
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregate span timings per node, step and external endpoint."""
+        nodes: Dict[str, float] = {}
+        steps: Dict[str, Dict[str, Any]] = {}
+        http: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            duration = round(span.duration_ms, 1)
+            if span.category == "node":
+                nodes[span.name] = round(nodes.get(span.name, 0) + duration, 1)
+            elif span.category == "http":
+                entry = http.setdefault(span.name, {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "request_bytes": 0, "response_bytes": 0, "retries": 0, "errors": 0
+                })
+                entry["count"] += 1
+                entry["total_ms"] = round(entry["total_ms"] + duration, 1)
+                entry["max_ms"] = max(entry["max_ms"], duration)
+                entry["request_bytes"] += span.attrs.get("request_bytes", 0)
+                entry["response_bytes"] += span.attrs.get("response_bytes", 0)
+                entry["retries"] += span.attrs.get("retry_count", 0)
+                if span.attrs.get("error") or span.attrs.get("status_code", 200) >= 400:
+                    entry["errors"] += 1
+            else:
+                entry = steps.setdefault(span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                entry["count"] += 1
+                entry["total_ms"] = round(entry["total_ms"] + duration, 1)
+                entry["max_ms"] = max(entry["max_ms"], duration)
+
+        ends = [span.end for span in self.spans if span.end is not None]
+        total_ms = (max(ends) - self.origin) * 1000 if ends else 0.0
+        return {
+            "total_ms": round(total_ms, 1),
+            "nodes": nodes,
+            "steps": steps,
+            "http": http
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export the spans in Chrome trace-event format (loadable in Perfetto)."""
+        events = [{
+            "name": "process_name",
+            "ph": "M",
+            "pid": 1,
+            "args": {"name": f"research job {self.job_id}"}
+        }]
+        for span in self.spans:
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.origin) * 1_000_000),
+                "dur": round(span.duration_ms * 1000),
+                "pid": 1,
+                "tid": span.lane,
+                "args": span.attrs
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"job_id": self.job_id, "started_at": self.started_at}
+        }
+
+
+class Tracer:
+    """Keeps the traces of running and recently finished jobs.
+
+    Finished traces are retained (TRACE_RETENTION, default 100) so they can be
+    exported after the job completes; set TRACE_OUTPUT_DIR to also write each
+    finished trace to disk.
+    """
+
+    def __init__(self, retention: Optional[int] = None, output_dir: Optional[str] = None):
+        self.retention = retention or int(os.getenv("TRACE_RETENTION", 100))
+        self.output_dir = output_dir or os.getenv("TRACE_OUTPUT_DIR")
+        self._traces: "OrderedDict[str, JobTrace]" = OrderedDict()
+
+    def start_job(self, job_id: str) -> JobTrace:
+        trace = JobTrace(job_id)
+        self._traces[job_id] = trace
+        self._traces.move_to_end(job_id)
+        while len(self._traces) > self.retention:
+            self._traces.popitem(last=False)
+        _current_trace.set(trace)
+        return trace
+
+    def get(self, job_id: Optional[str]) -> Optional[JobTrace]:
+        if not job_id:
+            return None
+        return self._traces.get(job_id)
+
+    def finish_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's timing summary and write the trace file if configured."""
+        trace = self.get(job_id)
+        if not trace:
+            return None
+        if self.output_dir:
+            self.export(job_id, os.path.join(self.output_dir, f"trace_{job_id}.json"))
+        return trace.summary()
+
+    def export(self, job_id: str, path: str) -> None:
+        trace = self.get(job_id)
+        if not trace:
+            raise KeyError(job_id)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace.to_chrome_trace(), f)
+        logger.info(f"Wrote trace for job {job_id} to {path}")
+
+
+tracer = Tracer()
+
+
+def current_trace() -> Optional[JobTrace]:
+    return _current_trace.get()
+
+
+def span(name: str, category: str = "step", **attrs):
+    """Span on the current job's trace, or a no-op context when not tracing."""
+    trace = current_trace()
+    if trace is None:
+        return contextlib.nullcontext()
+    return trace.span(name, category=category, **attrs)
+
+
+def traced_node(name: str, func: Callable) -> Callable:
+    """Wrap a graph node so each invocation is recorded as a span."""
+
+    @functools.wraps(func)
+    async def wrapper(state, *args, **kwargs):
+        trace = tracer.get(state.get("job_id")) or current_trace()
+        if trace is None:
+            return await func(state, *args, **kwargs)
+        _current_trace.set(trace)
+        with trace.span(name, category="node"):
+            return await func(state, *args, **kwargs)
+
+    return wrapper
+
+
+def traced(name: str) -> Callable:
+    """Decorator recording an async function call as a span of the current job."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = current_trace()
+            if trace is None:
+                return await func(*args, **kwargs)
+            with trace.span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _describe_request(provider: str, request: httpx.Request) -> Dict[str, Any]:
+    """Pick a few identifying fields out of a JSON request body."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return {}
+    if not isinstance(body, dict):
+        return {}
+    attrs = {}
+    if model := body.get("model"):
+        attrs["model"] = model
+    if query := body.get("query"):
+        attrs["query"] = query
+    if urls := body.get("urls"):
+        attrs["urls"] = urls if isinstance(urls, str) else len(urls)
+    return attrs
+
+
+class _TracedStream(httpx.AsyncByteStream):
+    """Counts response bytes and closes the span once the body is consumed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, span: Span):
+        self._stream = stream
+        self._span = span
+        self._bytes = 0
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._span.finish(response_bytes=self._bytes)
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording every provider request as a span."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, provider: str):
+        self._transport = transport
+        self.provider = provider
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        trace = current_trace()
+        if trace is None:
+            return await self._transport.handle_async_request(request)
+
+        try:
+            request_bytes = len(request.content)
+        except httpx.RequestNotRead:
+            request_bytes = 0
+        span = trace.span(
+            f"{self.provider} {request.url.path}",
+            category="http",
+            method=request.method,
+            request_bytes=request_bytes,
+            retry_count=int(request.headers.get("x-stainless-retry-count", 0) or 0),
+            **_describe_request(self.provider, request)
+        )
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            span.finish(error=type(e).__name__)
+            raise
+        span.attrs["status_code"] = response.status_code
+        try:
+            # Already buffered (e.g. in-memory transports): nothing left to stream
+            content = response.content
+        except httpx.ResponseNotRead:
+            response.stream = _TracedStream(response.stream, span)
+        else:
+            span.finish(response_bytes=len(content))
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JobURLs:
+    """URLs collected by the category pipelines of one job.
+
+    Records which categories curated each URL, and fetches each URL's
+    content once: concurrent and later requests from other categories share
+    the first extraction. The first category to claim a URL owns it (briefs
+    it in full); the owner never changes, so every briefing can decide as
+    soon as its own URLs are claimed, without waiting for the others.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        # url -> categories in the order they curated it
+        self.categories: Dict[str, List[str]] = {}
+        self._fetches: Dict[str, asyncio.Future] = {}
+        self.stats = {"extractions": 0, "reused": 0}
+
+    def claim(self, url: str, category: str) -> None:
+        categories = self.categories.setdefault(url, [])
+        if category not in categories:
+            categories.append(category)
+            if len(categories) == 2:
+                metrics.inc("urls_shared_across_categories")
+
+    def owner(self, url: str) -> Optional[str]:
+        categories = self.categories.get(url)
+        return categories[0] if categories else None
+
+    async def fetch(self, url: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `factory` once per URL within the job; other callers share the result."""
+        if (future := self._fetches.get(url)) is not None:
+            self.stats["reused"] += 1
+            metrics.inc("url_fetches_reused")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The category that started the fetch gave up (e.g. its deadline), not this one
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.fetch(url, factory)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._fetches[url] = future
+        self.stats["extractions"] += 1
+        try:
+            result = await factory()
+        except BaseException as e:
+            # Failures are not remembered: the next category retries
+            self._fetches.pop(url, None)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        future.set_result(result)
+        return result
+
+
+class URLRegistry:
+    """Per-job URL registries, dropped when the job finishes."""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobURLs] = {}
+
+    def for_job(self, job_id: Optional[str]) -> Optional[JobURLs]:
+        if not job_id:
+            return None
+        if job_id not in self._jobs:
+            self._jobs[job_id] = JobURLs(job_id)
+        return self._jobs[job_id]
+
+    def release(self, job_id: str) -> None:
+        if (job_urls := self._jobs.pop(job_id, None)) is not None:
+            shared = sum(1 for categories in job_urls.categories.values() if len(categories) > 1)
+            logger.info(f"Job {job_id}: {len(job_urls.categories)} curated URLs, {shared} shared across "
+                        f"categories, {job_urls.stats['extractions']} extractions, "
+                        f"{job_urls.stats['reused']} reused")
+
+
+url_registry = URLRegistry()
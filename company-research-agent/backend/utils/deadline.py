@@ -0,0 +1,71 @@
+"""Time budget helpers for deadline-bound research jobs.
+
+A job with a deadline carries `deadline` (absolute epoch seconds) and
+`deadline_seconds` (the total budget) in its state. Stages ask how far they
+are behind schedule and shrink their work accordingly, so the job still
+produces a (shorter) report within its budget. A stage that shrinks or
+cuts short its work sets `deadline_degraded` in the state it was given.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Share of the budget normally still left when each stage starts; research
+# leaves room for queueing and grounding, so an on-schedule job is not scaled
+STAGE_BUDGET = {
+    "research": 0.9,
+    "enrich": 0.6,
+    "brief": 0.45,
+    "edit": 0.25
+}
+
+
+def remaining(state: Dict[str, Any]) -> Optional[float]:
+    """Seconds left before the deadline, or None when the job has no deadline."""
+    deadline = state.get('deadline')
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expired(state: Dict[str, Any]) -> bool:
+    left = remaining(state)
+    return left is not None and left <= 0
+
+
+def budget_factor(state: Dict[str, Any], stage: str) -> float:
+    """1.0 when the stage starts on schedule (or there is no deadline), down to 0.0 when out of time."""
+    left = remaining(state)
+    total = state.get('deadline_seconds')
+    if left is None or not total:
+        return 1.0
+    expected = STAGE_BUDGET.get(stage, 1.0) * total
+    return max(0.0, min(1.0, left / expected))
+
+
+def scaled(state: Dict[str, Any], stage: str, full: int, minimum: int = 1) -> int:
+    """Scale a work size (query count, documents, characters) by the stage's budget factor."""
+    factor = budget_factor(state, stage)
+    size = min(full, max(minimum, round(full * factor)))
+    if size < full:
+        state['deadline_degraded'] = True
+        logger.info(f"Behind schedule at {stage} stage (factor {factor:.2f}), reducing {full} -> {size}")
+    return size
+
+
+async def within_deadline(state: Dict[str, Any], awaitable: Awaitable[T], default: T, what: str = "step") -> T:
+    """Await `awaitable`, giving up with `default` once the job's deadline passes."""
+    left = remaining(state)
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(left, 0))
+    except asyncio.TimeoutError:
+        state['deadline_degraded'] = True
+        logger.warning(f"Deadline reached during {what}, continuing without it")
+        return default
@@ -255,6 +255,44 @@ class TextReferenceLinker:
         
         return ref_text
     
+    # 跨进程传递时每个数据源最多保留的字符数（引用匹配只需要摘要中的数值）
+    def export_state(self) -> Dict[str, Any]:
+        """导出引用匹配所需的状态（用于跨进程传递）
+
+        数据源按 URL 归并：每个 URL 只带一次标题和分数，正文完整保留，因为
+        process_text 在整篇正文中查找匹配文本。
+        """
+        sources: Dict[str, List[Any]] = {}
+        for data, urls in self.data_to_urls.items():
+            for url, title, score in urls:
+                source = sources.setdefault(url, [title, score, []])
+                if data not in source[2]:
+                    source[2].append(data)
+        return {
+            "sources": sources,
+            "url_to_title": self.url_to_title,
+            "url_to_ref": self.url_to_ref,
+            "ref_to_title": self.ref_to_title
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """从 export_state() 的结果恢复状态"""
+        self.reset()
+        for url, (title, score, texts) in state.get("sources", {}).items():
+            for data in texts:
+                self.data_to_urls.setdefault(data, []).append((url, title, score))
+            self._get_or_create_ref_number(url)
+        # 旧格式（按正文索引），用于读取升级前保存的报告快照
+        for data, urls in state.get("data_to_urls", {}).items():
+            for url, title, score in urls:
+                self.data_to_urls.setdefault(data, []).append((url, title, score))
+                self._get_or_create_ref_number(url)
+        self.url_to_title.update(state.get("url_to_title", {}))
+        self.url_to_ref.update(state.get("url_to_ref", {}))
+        self.ref_to_url.update({ref: url for url, ref in self.url_to_ref.items()})
+        # JSON 序列化后字典键会变成字符串
+        self.ref_to_title.update({int(ref): title for ref, title in state.get("ref_to_title", {}).items()})
+
     def reset(self) -> None:
         """重置链接器状态"""
         self.url_to_number.clear()
@@ -456,11 +456,14 @@ function App() {
               return prev;
             });
           }
-          // Update final doc counts when curation is complete
+          // Update final doc counts when a category's curation is complete
           else if (statusData.status === "curation_complete" && statusData.result.doc_counts) {
             setResearchState((prev) => ({
               ...prev,
-              docCounts: statusData.result.doc_counts as DocCounts
+              docCounts: {
+                ...prev.docCounts,
+                ...statusData.result.doc_counts
+              } as DocCounts
             }));
           }
         }